@@ -3,48 +3,127 @@
 Analyze consistency between plugin logs, metrics.jsonl, and traces.jsonl
 """
 
-import json
+import mmap
+import os
 import re
-from collections import defaultdict
-from datetime import datetime
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from analyze_metrics import iter_metric_datapoints
+
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
 
 # File paths
 LOGS_FILE = "/home/mtk26468/.local/share/opencode/telemetry-plugin.log"
 METRICS_FILE = "/home/mtk26468/opencode/otel-data/metrics.jsonl"
 TRACES_FILE = "/home/mtk26468/opencode/otel-data/traces.jsonl"
 
-print("=" * 80)
-print("OpenCode Telemetry - Consistency Analysis")
-print("=" * 80)
-print()
+# Fixed substrings that identify the plugin log lines we care about
+LOG_MARKERS = (b'LOC recorded:', b'PERMISSION RECORDED:', b'AUTO-APPROVED EDIT recorded:')
+
+# LOC, permission and auto-approve log events, compiled once. Each marker
+# is checked on its own, so a line can hold more than one event
+LOC_RE = re.compile(r'\+(\d+) -(\d+) \(tool=(\w+), language=(\w+), callID=(toolu_\w+)\)')
+PERMISSION_RE = re.compile(r'PERMISSION RECORDED: (\w+) -> (\w+) \(tool=(\w+)')
+CALL_ID_RE = re.compile(r'callID=(toolu_\w+)')
+
+# Metric name -> key in the metrics totals
+METRIC_TOTALS = {
+    'opencode.tool.loc.added': 'loc_added',
+    'opencode.tool.loc.deleted': 'loc_deleted',
+    'opencode.tool.executions': 'executions',
+    'opencode.permission.requests': 'permissions',
+}
+
+# Shared read-only fallback for missing attributes (avoids a new {} per lookup)
+EMPTY = {}
+
+# OTEL keys read in the hot loops, interned once up front
+STRING_VALUE = sys.intern('stringValue')
+ATTR_PERMISSION_REPLY = sys.intern('permission.reply')
+ATTR_AUTO_APPROVE_EDIT = sys.intern('auto_approve_edit')
+ATTR_TOOL_CALL_NAME = sys.intern('ai.toolCall.name')
+ATTR_SESSION_ID = sys.intern('session.id')
+ATTR_CALL_ID = sys.intern('call.id')
+ATTR_FILE_PATH = sys.intern('file.path')
+ATTR_LANGUAGE = sys.intern('language')
+
+
+def iter_event_lines(path):
+    """
+    Yield the log lines containing any of LOG_MARKERS, in file order.
+
+    The file is memory-mapped and each marker is located with mmap.find, so
+    the scan jumps from hit to hit in C instead of visiting every line.
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            line_starts = set()
+            for marker in LOG_MARKERS:
+                pos = mm.find(marker)
+                while pos != -1:
+                    line_starts.add(mm.rfind(b'\n', 0, pos) + 1)
+                    end = mm.find(b'\n', pos)
+                    if end == -1:
+                        break
+                    pos = mm.find(marker, end)
+
+            for start in sorted(line_starts):
+                end = mm.find(b'\n', start)
+                if end == -1:
+                    end = len(mm)
+                yield mm[start:end].decode('utf-8', errors='replace')
+
+
+def parse_loc_line(line):
+    """
+    Parse a "LOC recorded: +A -D (tool=T, language=L, callID=C)" line.
+
+    Returns the event dict, or None if the line does not have that layout.
+    """
+    match = LOC_RE.search(line)
+    if not match:
+        return None
+    return {
+        'added': int(match.group(1)),
+        'deleted': int(match.group(2)),
+        'tool': match.group(3),
+        'language': match.group(4),
+        'callID': match.group(5)
+    }
+
 
 # ============================================================================
-# 1. Analyze Plugin Logs
+# 1. Plugin Logs
 # ============================================================================
-print("1. PLUGIN LOGS ANALYSIS")
-print("-" * 80)
 
-loc_events = []
-permission_events = []
-auto_approve_events = []
+def scan_logs(path):
+    """Collect LOC, permission and auto-approve events from the plugin log."""
+    # LOC events keyed by callID (duplicates collapse, last one wins) plus a
+    # per-callID count so duplicate log entries can still be reported
+    unique_loc_events = {}
+    loc_by_callid = Counter()
+    permission_events = []
+    auto_approve_events = []
 
-with open(LOGS_FILE, 'r') as f:
-    for line in f:
+    for line in iter_event_lines(path):
         # Extract LOC events
-        if "LOC recorded:" in line:
-            match = re.search(r'\+(\d+) -(\d+) \(tool=(\w+), language=(\w+), callID=(toolu_\w+)\)', line)
-            if match:
-                loc_events.append({
-                    'added': int(match.group(1)),
-                    'deleted': int(match.group(2)),
-                    'tool': match.group(3),
-                    'language': match.group(4),
-                    'callID': match.group(5)
-                })
+        if 'LOC recorded:' in line:
+            event = parse_loc_line(line)
+            if event:
+                call_id = event['callID']
+                unique_loc_events[call_id] = event
+                loc_by_callid[call_id] += 1
 
         # Extract permission events
-        if "PERMISSION RECORDED:" in line:
-            match = re.search(r'PERMISSION RECORDED: (\w+) -> (\w+) \(tool=(\w+)', line)
+        if 'PERMISSION RECORDED:' in line:
+            match = PERMISSION_RE.search(line)
             if match:
                 permission_events.append({
                     'permission': match.group(1),
@@ -53,233 +132,299 @@ with open(LOGS_FILE, 'r') as f:
                 })
 
         # Extract auto-approved events
-        if "AUTO-APPROVED EDIT recorded:" in line:
-            match = re.search(r'callID=(toolu_\w+)', line)
+        if 'AUTO-APPROVED EDIT recorded:' in line:
+            match = CALL_ID_RE.search(line)
             if match:
                 auto_approve_events.append({
                     'callID': match.group(1)
                 })
 
-print(f"LOC events logged: {len(loc_events)}")
-print(f"Permission events logged: {len(permission_events)}")
-print(f"Auto-approved events logged: {len(auto_approve_events)}")
-print()
-
-# Check for duplicates
-loc_by_callid = defaultdict(int)
-for event in loc_events:
-    loc_by_callid[event['callID']] += 1
+    return {
+        'unique_loc_events': unique_loc_events,
+        'loc_by_callid': loc_by_callid,
+        'permission_events': permission_events,
+        'auto_approve_events': auto_approve_events,
+    }
 
-duplicates = {k: v for k, v in loc_by_callid.items() if v > 1}
-if duplicates:
-    print(f"⚠️  DUPLICATE LOG ENTRIES DETECTED:")
-    for callid, count in duplicates.items():
-        print(f"   {callid}: {count} times")
-    print()
 
 # ============================================================================
-# 2. Analyze Metrics
+# 2. Metrics
 # ============================================================================
-print("2. METRICS.JSONL ANALYSIS")
-print("-" * 80)
-
-metrics_exports = []
-total_loc_added = 0
-total_loc_deleted = 0
-total_executions = 0
-total_permissions = 0
-permission_by_reply = defaultdict(int)
-auto_approve_count = defaultdict(int)
-
-with open(METRICS_FILE, 'r') as f:
-    for line in f:
-        if line.strip():
-            export = json.loads(line)
-            metrics_exports.append(export)
-
-            # Extract metrics from each export
-            for rm in export.get('resourceMetrics', []):
-                for scope in rm.get('scopeMetrics', []):
-                    for metric in scope.get('metrics', []):
-                        name = metric.get('name')
-
-                        if name == 'opencode.tool.loc.added':
-                            for dp in metric.get('sum', {}).get('dataPoints', []):
-                                total_loc_added += dp.get('asDouble', 0)
-
-                        elif name == 'opencode.tool.loc.deleted':
-                            for dp in metric.get('sum', {}).get('dataPoints', []):
-                                total_loc_deleted += dp.get('asDouble', 0)
-
-                        elif name == 'opencode.tool.executions':
-                            for dp in metric.get('sum', {}).get('dataPoints', []):
-                                total_executions += dp.get('asDouble', 0)
-
-                        elif name == 'opencode.permission.requests':
-                            for dp in metric.get('sum', {}).get('dataPoints', []):
-                                total_permissions += dp.get('asDouble', 0)
-                                # Extract reply type
-                                reply = None
-                                auto_approve = None
-                                for attr in dp.get('attributes', []):
-                                    if attr['key'] == 'permission.reply':
-                                        reply = attr['value']['stringValue']
-                                    if attr['key'] == 'auto_approve_edit':
-                                        auto_approve = attr['value']['stringValue']
-
-                                if reply:
-                                    permission_by_reply[reply] += dp.get('asDouble', 0)
-                                if auto_approve:
-                                    auto_approve_count[auto_approve] += dp.get('asDouble', 0)
-
-print(f"Metric exports: {len(metrics_exports)}")
-print(f"Total LOC added: {int(total_loc_added)}")
-print(f"Total LOC deleted: {int(total_loc_deleted)}")
-print(f"Total tool executions: {int(total_executions)}")
-print(f"Total permission requests: {int(total_permissions)}")
-print()
-print("Permission breakdown by reply type:")
-for reply, count in sorted(permission_by_reply.items()):
-    print(f"  {reply}: {int(count)}")
-print()
-print("Permission breakdown by auto_approve_edit:")
-for auto_val, count in sorted(auto_approve_count.items()):
-    print(f"  auto_approve_edit={auto_val}: {int(count)}")
-print()
 
-# ============================================================================
-# 3. Analyze Traces
-# ============================================================================
-print("3. TRACES.JSONL ANALYSIS")
-print("-" * 80)
-
-trace_exports = []
-total_spans = 0
-spans_by_name = defaultdict(int)
-tool_call_spans = []
-
-with open(TRACES_FILE, 'r') as f:
-    for line in f:
-        if line.strip():
-            export = json.loads(line)
-            trace_exports.append(export)
-
-            # Extract spans from each export
-            for rs in export.get('resourceSpans', []):
-                for scope in rs.get('scopeSpans', []):
-                    for span in scope.get('spans', []):
-                        total_spans += 1
-                        span_name = span.get('name', 'unknown')
-                        spans_by_name[span_name] += 1
-
-                        # Look for ai.toolCall spans
-                        if span_name == 'ai.toolCall':
-                            attrs = {}
-                            for attr in span.get('attributes', []):
-                                attrs[attr['key']] = attr.get('value', {})
-                            tool_call_spans.append({
-                                'name': attrs.get('ai.toolCall.name', {}).get('stringValue'),
-                                'session_id': attrs.get('session.id', {}).get('stringValue'),
-                                'call_id': attrs.get('call.id', {}).get('stringValue'),
-                                'file_path': attrs.get('file.path', {}).get('stringValue'),
-                                'language': attrs.get('language', {}).get('stringValue')
-                            })
-
-print(f"Trace exports: {len(trace_exports)}")
-print(f"Total spans: {total_spans}")
-print()
-print("Spans by name:")
-for name, count in sorted(spans_by_name.items()):
-    print(f"  {name}: {count}")
-print()
-print(f"Tool call spans with session context: {len(tool_call_spans)}")
-print()
+def scan_metrics(path):
+    """Sum the LOC/execution/permission metrics in metrics.jsonl."""
+    exports = 0
+    totals = {'loc_added': 0, 'loc_deleted': 0, 'executions': 0, 'permissions': 0}
+    permission_by_reply = Counter()
+    auto_approve_count = Counter()
+
+    # Binary mode: the JSON decoder takes bytes, so lines are never decoded to str
+    with open(path, 'rb') as f:
+        for line in f:
+            if not line.isspace():
+                export = json_loads(line)
+                exports += 1
+
+                # Extract metrics from each export
+                for name, data_points in iter_metric_datapoints(export, METRIC_TOTALS):
+                    total_key = METRIC_TOTALS[name]
+
+                    # One reduction per metric rather than a += per datapoint
+                    totals[total_key] += sum(dp.get('asDouble', 0) for dp in data_points)
+
+                    if total_key == 'permissions':
+                        for dp in data_points:
+                            # Extract reply type; pick the two keys out directly
+                            # instead of building a dict of every attribute
+                            reply = auto_approve = None
+                            for attr in dp.get('attributes', ()):
+                                key = attr['key']
+                                if key == ATTR_PERMISSION_REPLY:
+                                    reply = attr['value'].get(STRING_VALUE)
+                                elif key == ATTR_AUTO_APPROVE_EDIT:
+                                    auto_approve = attr['value'].get(STRING_VALUE)
+
+                            if reply:
+                                permission_by_reply[reply] += dp.get('asDouble', 0)
+                            if auto_approve:
+                                auto_approve_count[auto_approve] += dp.get('asDouble', 0)
+
+    return {
+        'exports': exports,
+        'totals': totals,
+        'permission_by_reply': permission_by_reply,
+        'auto_approve_count': auto_approve_count,
+    }
 
-# ============================================================================
-# 4. Consistency Check
-# ============================================================================
-print("4. CONSISTENCY CHECK")
-print("-" * 80)
-
-# Remove duplicates from logs for fair comparison
-unique_loc_events = {}
-for event in loc_events:
-    unique_loc_events[event['callID']] = event
-unique_count = len(unique_loc_events)
-
-print(f"LOG: {len(loc_events)} LOC events ({unique_count} unique callIDs)")
-print(f"METRICS: {int(total_loc_added)} lines added, {int(total_loc_deleted)} lines deleted")
-print(f"TRACES: {len(tool_call_spans)} tool call spans with context")
-print()
-
-# Calculate expected vs actual
-# Each LOC event should result in +N/-N in metrics
-expected_additions = sum(e['added'] for e in unique_loc_events.values())
-expected_deletions = sum(e['deleted'] for e in unique_loc_events.values())
-
-print("Expected (from unique log events):")
-print(f"  LOC added: {expected_additions}")
-print(f"  LOC deleted: {expected_deletions}")
-print()
-
-print("Actual (from metrics):")
-print(f"  LOC added: {int(total_loc_added)}")
-print(f"  LOC deleted: {int(total_loc_deleted)}")
-print()
-
-# Check consistency
-if int(total_loc_added) == expected_additions:
-    print("✅ LOC added: CONSISTENT")
-else:
-    print(f"⚠️  LOC added: MISMATCH (expected {expected_additions}, got {int(total_loc_added)})")
-
-if int(total_loc_deleted) == expected_deletions:
-    print("✅ LOC deleted: CONSISTENT")
-else:
-    print(f"⚠️  LOC deleted: MISMATCH (expected {expected_deletions}, got {int(total_loc_deleted)})")
-print()
-
-# Check permission events
-print("Permission events:")
-print(f"  LOG: {len(permission_events)} manual permissions + {len(auto_approve_events)} auto-approved")
-print(f"  METRICS: {int(total_permissions)} total permissions")
-print()
 
 # ============================================================================
-# 5. Summary
+# 3. Traces
 # ============================================================================
-print("=" * 80)
-print("SUMMARY")
-print("=" * 80)
-
-issues = []
-
-if duplicates:
-    issues.append(f"⚠️  Duplicate log entries detected ({len(duplicates)} call IDs)")
-
-if int(total_loc_added) != expected_additions:
-    issues.append("⚠️  LOC added metrics don't match log events")
-
-if int(total_loc_deleted) != expected_deletions:
-    issues.append("⚠️  LOC deleted metrics don't match log events")
-
-if len(tool_call_spans) == 0 and total_spans > 0:
-    issues.append("⚠️  Trace spans exist but no tool call spans with session context")
-
-if not issues:
-    print("✅ All telemetry data is CONSISTENT!")
-    print()
-    print("Summary:")
-    print(f"  - {unique_count} unique tool executions")
-    print(f"  - {int(total_loc_added)} lines added, {int(total_loc_deleted)} lines deleted")
-    print(f"  - {int(total_permissions)} permission events")
-    print(f"  - {len(tool_call_spans)} traced tool calls")
-else:
-    print("Issues found:")
-    for issue in issues:
-        print(f"  {issue}")
-    print()
-    print("Note: Duplicate log entries suggest the plugin might be loaded twice.")
-    print("This is expected with bundled plugins and doesn't affect functionality.")
-
-print()
+
+def iter_export_spans(line):
+    """Yield the spans of one traces.jsonl export line."""
+    for rs in json_loads(line).get('resourceSpans', []):
+        for scope in rs.get('scopeSpans', []):
+            yield from scope.get('spans', [])
+
+
+def scan_traces(path):
+    """Count spans in traces.jsonl and collect the tool call spans."""
+    exports = 0
+    total_spans = 0
+    spans_by_name = Counter()
+    tool_call_spans = []
+    # Bound once; this runs for every tool call span in the file
+    add_tool_call = tool_call_spans.append
+
+    # Binary mode: the JSON decoder takes bytes, so lines are never decoded to str
+    with open(path, 'rb') as f:
+        for line in f:
+            if not line.isspace():
+                exports += 1
+
+                for span in iter_export_spans(line):
+                    span_name = span.get('name', 'unknown')
+                    total_spans += 1
+                    spans_by_name[span_name] += 1
+
+                    # Look for ai.toolCall spans
+                    if span_name == 'ai.toolCall':
+                        attrs = {attr['key']: attr.get('value', EMPTY) for attr in span.get('attributes', [])}
+                        add_tool_call({
+                            'name': attrs.get(ATTR_TOOL_CALL_NAME, EMPTY).get(STRING_VALUE),
+                            'session_id': attrs.get(ATTR_SESSION_ID, EMPTY).get(STRING_VALUE),
+                            'call_id': attrs.get(ATTR_CALL_ID, EMPTY).get(STRING_VALUE),
+                            'file_path': attrs.get(ATTR_FILE_PATH, EMPTY).get(STRING_VALUE),
+                            'language': attrs.get(ATTR_LANGUAGE, EMPTY).get(STRING_VALUE)
+                        })
+
+    return {
+        'exports': exports,
+        'total_spans': total_spans,
+        'spans_by_name': spans_by_name,
+        'tool_call_spans': tool_call_spans,
+    }
+
+
+def main():
+    # The three inputs are independent until the consistency check, so scan
+    # them concurrently in separate processes
+    with ProcessPoolExecutor(max_workers=3) as executor:
+        logs_future = executor.submit(scan_logs, LOGS_FILE)
+        metrics_future = executor.submit(scan_metrics, METRICS_FILE)
+        traces_future = executor.submit(scan_traces, TRACES_FILE)
+        logs = logs_future.result()
+        metrics = metrics_future.result()
+        traces = traces_future.result()
+
+    # Build the whole report and write it once
+    out = []
+
+    out.append("=" * 80)
+    out.append("OpenCode Telemetry - Consistency Analysis")
+    out.append("=" * 80)
+    out.append("")
+
+    # ========================================================================
+    # 1. Analyze Plugin Logs
+    # ========================================================================
+    out.append("1. PLUGIN LOGS ANALYSIS")
+    out.append("-" * 80)
+
+    unique_loc_events = logs['unique_loc_events']
+    loc_by_callid = logs['loc_by_callid']
+    permission_events = logs['permission_events']
+    auto_approve_events = logs['auto_approve_events']
+    loc_event_count = sum(loc_by_callid.values())
+
+    out.append(f"LOC events logged: {loc_event_count}")
+    out.append(f"Permission events logged: {len(permission_events)}")
+    out.append(f"Auto-approved events logged: {len(auto_approve_events)}")
+    out.append("")
+
+    # Check for duplicates
+    duplicates = {k: v for k, v in loc_by_callid.items() if v > 1}
+    if duplicates:
+        out.append(f"⚠️  DUPLICATE LOG ENTRIES DETECTED:")
+        for callid, count in duplicates.items():
+            out.append(f"   {callid}: {count} times")
+        out.append("")
+
+    # ========================================================================
+    # 2. Analyze Metrics
+    # ========================================================================
+    out.append("2. METRICS.JSONL ANALYSIS")
+    out.append("-" * 80)
+
+    totals = metrics['totals']
+    total_loc_added = totals['loc_added']
+    total_loc_deleted = totals['loc_deleted']
+    total_executions = totals['executions']
+    total_permissions = totals['permissions']
+
+    out.append(f"Metric exports: {metrics['exports']}")
+    out.append(f"Total LOC added: {int(total_loc_added)}")
+    out.append(f"Total LOC deleted: {int(total_loc_deleted)}")
+    out.append(f"Total tool executions: {int(total_executions)}")
+    out.append(f"Total permission requests: {int(total_permissions)}")
+    out.append("")
+    out.append("Permission breakdown by reply type:")
+    for reply, count in sorted(metrics['permission_by_reply'].items()):
+        out.append(f"  {reply}: {int(count)}")
+    out.append("")
+    out.append("Permission breakdown by auto_approve_edit:")
+    for auto_val, count in sorted(metrics['auto_approve_count'].items()):
+        out.append(f"  auto_approve_edit={auto_val}: {int(count)}")
+    out.append("")
+
+    # ========================================================================
+    # 3. Analyze Traces
+    # ========================================================================
+    out.append("3. TRACES.JSONL ANALYSIS")
+    out.append("-" * 80)
+
+    total_spans = traces['total_spans']
+    tool_call_spans = traces['tool_call_spans']
+
+    out.append(f"Trace exports: {traces['exports']}")
+    out.append(f"Total spans: {total_spans}")
+    out.append("")
+    out.append("Spans by name:")
+    for name, count in sorted(traces['spans_by_name'].items()):
+        out.append(f"  {name}: {count}")
+    out.append("")
+    out.append(f"Tool call spans with session context: {len(tool_call_spans)}")
+    out.append("")
+
+    # ========================================================================
+    # 4. Consistency Check
+    # ========================================================================
+    out.append("4. CONSISTENCY CHECK")
+    out.append("-" * 80)
+
+    # Duplicates were already collapsed while reading the logs
+    unique_count = len(unique_loc_events)
+
+    out.append(f"LOG: {loc_event_count} LOC events ({unique_count} unique callIDs)")
+    out.append(f"METRICS: {int(total_loc_added)} lines added, {int(total_loc_deleted)} lines deleted")
+    out.append(f"TRACES: {len(tool_call_spans)} tool call spans with context")
+    out.append("")
+
+    # Calculate expected vs actual
+    # Each LOC event should result in +N/-N in metrics
+    expected_additions = sum(e['added'] for e in unique_loc_events.values())
+    expected_deletions = sum(e['deleted'] for e in unique_loc_events.values())
+
+    out.append("Expected (from unique log events):")
+    out.append(f"  LOC added: {expected_additions}")
+    out.append(f"  LOC deleted: {expected_deletions}")
+    out.append("")
+
+    out.append("Actual (from metrics):")
+    out.append(f"  LOC added: {int(total_loc_added)}")
+    out.append(f"  LOC deleted: {int(total_loc_deleted)}")
+    out.append("")
+
+    # Check consistency
+    if int(total_loc_added) == expected_additions:
+        out.append("✅ LOC added: CONSISTENT")
+    else:
+        out.append(f"⚠️  LOC added: MISMATCH (expected {expected_additions}, got {int(total_loc_added)})")
+
+    if int(total_loc_deleted) == expected_deletions:
+        out.append("✅ LOC deleted: CONSISTENT")
+    else:
+        out.append(f"⚠️  LOC deleted: MISMATCH (expected {expected_deletions}, got {int(total_loc_deleted)})")
+    out.append("")
+
+    # Check permission events
+    out.append("Permission events:")
+    out.append(f"  LOG: {len(permission_events)} manual permissions + {len(auto_approve_events)} auto-approved")
+    out.append(f"  METRICS: {int(total_permissions)} total permissions")
+    out.append("")
+
+    # ========================================================================
+    # 5. Summary
+    # ========================================================================
+    out.append("=" * 80)
+    out.append("SUMMARY")
+    out.append("=" * 80)
+
+    issues = []
+
+    if duplicates:
+        issues.append(f"⚠️  Duplicate log entries detected ({len(duplicates)} call IDs)")
+
+    if int(total_loc_added) != expected_additions:
+        issues.append("⚠️  LOC added metrics don't match log events")
+
+    if int(total_loc_deleted) != expected_deletions:
+        issues.append("⚠️  LOC deleted metrics don't match log events")
+
+    if len(tool_call_spans) == 0 and total_spans > 0:
+        issues.append("⚠️  Trace spans exist but no tool call spans with session context")
+
+    if not issues:
+        out.append("✅ All telemetry data is CONSISTENT!")
+        out.append("")
+        out.append("Summary:")
+        out.append(f"  - {unique_count} unique tool executions")
+        out.append(f"  - {int(total_loc_added)} lines added, {int(total_loc_deleted)} lines deleted")
+        out.append(f"  - {int(total_permissions)} permission events")
+        out.append(f"  - {len(tool_call_spans)} traced tool calls")
+    else:
+        out.append("Issues found:")
+        for issue in issues:
+            out.append(f"  {issue}")
+        out.append("")
+        out.append("Note: Duplicate log entries suggest the plugin might be loaded twice.")
+        out.append("This is expected with bundled plugins and doesn't affect functionality.")
+
+    out.append("")
+
+    sys.stdout.write("\n".join(out) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -14,52 +14,171 @@ Default path: /home/mtk26468/opencode/otel-data/metrics.jsonl
 """
 
 import argparse
+import importlib.util
 import json
+import os
 import sys
-from collections import defaultdict
+import time
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timezone
-from typing import Dict, Any, List, Optional
+from functools import lru_cache
+from itertools import chain, islice
+from typing import Dict, Any, Container, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+# Records per insert_many call when sending to MongoDB, and batches in flight
+INSERT_BATCH_SIZE = 1000
+INSERT_WORKERS = 4
+
+# zstd wire compression needs the zstandard package; zlib is always available
+MONGO_COMPRESSORS = "zstd,zlib" if importlib.util.find_spec("zstandard") else "zlib"
+
+# Metrics files below this size are never split across processes
+PARALLEL_MIN_BYTES = 32 * 1024 * 1024
+
+# Metric names dispatched on in the hot loops, interned once up front
+METRIC_LOC_ADDED = sys.intern("opencode.tool.loc.added")
+METRIC_LOC_DELETED = sys.intern("opencode.tool.loc.deleted")
+METRIC_PERMISSION_REQUESTS = sys.intern("opencode.permission.requests")
+
+# Metrics read by extract_records_for_mongo(); all others are skipped
+RECORD_METRICS = frozenset({METRIC_LOC_ADDED, METRIC_LOC_DELETED, METRIC_PERMISSION_REQUESTS})
+
+# Shared read-only fallback for missing OTEL levels
+EMPTY = {}
+
+# OTEL attribute keys read in the hot loops, interned once up front
+ATTR_CALL_ID = sys.intern("call.id")
+ATTR_LANGUAGE = sys.intern("language")
+ATTR_FILE_PATH = sys.intern("file.path")
+ATTR_MODEL = sys.intern("model")
+ATTR_USER = sys.intern("user")
+ATTR_VERSION = sys.intern("version")
+ATTR_SESSION_ID = sys.intern("session.id")
+ATTR_PERMISSION_REPLY = sys.intern("permission.reply")
+ATTR_AUTO_APPROVE_EDIT = sys.intern("auto_approve_edit")
+
+def intern_value(value: Any) -> Any:
+    """sys.intern() string attribute values; anything else is returned as-is."""
+    return sys.intern(value) if type(value) is str else value
+
+def iter_jsonl_file(filepath: str, start: int = 0, end: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Read and parse a JSONL export file (metrics or traces), yielding one
+    export per line.
 
-def parse_metrics_file(filepath: str) -> list:
-    """Read and parse the JSONL metrics file."""
-    metrics = []
-    with open(filepath, 'r') as f:
+    start/end restrict the read to the lines beginning in that byte range
+    (start must be a line boundary, see split_file).
+    """
+    # Binary mode: the JSON decoder takes bytes, so lines are never decoded to str.
+    # Lines are passed unstripped; the decoder skips the trailing newline itself.
+    with open(filepath, 'rb', buffering=1 << 20) as f:
+        # Ask for a larger readahead window on the sequential scan (Linux only)
+        try:
+            os.posix_fadvise(f.fileno(), start, 0, os.POSIX_FADV_SEQUENTIAL)
+        except (AttributeError, OSError):
+            pass
+        f.seek(start)
+        pos = start
         for line in f:
-            line = line.strip()
-            if line:
+            if end is not None and pos >= end:
+                break
+            pos += len(line)
+            if not line.isspace():
                 try:
-                    metrics.append(json.loads(line))
+                    yield json_loads(line)
                 except json.JSONDecodeError as e:
-                    print(f"Warning: Skipping invalid JSON line: {e}")
-    return metrics
+                    # One flushed write per warning so parallel workers never interleave
+                    sys.stdout.write(f"Warning: Skipping invalid JSON line: {e}\n")
+                    sys.stdout.flush()
+
+def split_file(filepath: str, parts: int) -> List[Tuple[int, int]]:
+    """Split a file into up to `parts` (start, end) byte ranges on line boundaries."""
+    size = os.path.getsize(filepath)
+    bounds = [0]
+    with open(filepath, 'rb') as f:
+        for i in range(1, parts):
+            f.seek(max(size * i // parts - 1, bounds[-1]))
+            f.readline()
+            bounds.append(min(f.tell(), size))
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if start < end]
+
+def get_value(value: dict) -> Any:
+    """Unwrap an OTEL attribute value union."""
+    # Handle different value types; stringValue (by far the most common) is
+    # tested first, which beats a dict-based dispatch on the key
+    if "stringValue" in value:
+        return value["stringValue"]
+    elif "intValue" in value:
+        return int(value["intValue"])
+    elif "doubleValue" in value:
+        return float(value["doubleValue"])
+    elif "boolValue" in value:
+        return value["boolValue"]
+    return None
+
+def attributes_to_dict(attributes: list) -> Dict[str, Any]:
+    """
+    Map OTEL attribute keys to their values in one pass over the list.
+
+    Built in reverse so the first occurrence of a key wins, as with
+    get_attribute.
+    """
+    return {attr.get("key"): get_value(attr.get("value", EMPTY)) for attr in reversed(attributes)}
 
-def get_attribute_value(attributes: list, key: str) -> Any:
-    """Extract attribute value by key from OTEL attributes list."""
+def get_attribute(attributes: list, key: str) -> Any:
+    """Unwrap a single attribute (its first occurrence) without converting the whole list."""
     for attr in attributes:
         if attr.get("key") == key:
-            value = attr.get("value", {})
-            # Handle different value types
-            if "stringValue" in value:
-                return value["stringValue"]
-            elif "intValue" in value:
-                return int(value["intValue"])
-            elif "doubleValue" in value:
-                return float(value["doubleValue"])
-            elif "boolValue" in value:
-                return value["boolValue"]
+            return get_value(attr.get("value", EMPTY))
     return None
 
+def iter_metric_datapoints(export: Dict[str, Any], names: Optional[Container[str]] = None) -> Iterator[Tuple[str, Any]]:
+    """
+    Walk resourceMetrics -> scopeMetrics -> metrics of one export and yield
+    (metric name, sum dataPoints) per metric.
+
+    If names is given, metrics with other names are skipped with a single
+    membership test, before their sum/dataPoints are looked up.
+
+    Shared with analyze-consistency.py and send-to-mongodb.py. Missing
+    levels default to an empty tuple so no throwaway lists are allocated.
+    """
+    for rm in export.get("resourceMetrics", ()):
+        for sm in rm.get("scopeMetrics", ()):
+            for metric in sm.get("metrics", ()):
+                name = metric.get("name", "")
+                if names is None or name in names:
+                    yield name, metric.get("sum", EMPTY).get("dataPoints", ())
+
+@lru_cache(maxsize=8192)
+def cached_nano_to_iso(nano_timestamp: str) -> str:
+    """
+    Convert a valid nanosecond timestamp to ISO 8601 format.
+
+    Datapoints from the same export share a timeUnixNano, so most calls are
+    cache hits. Raises ValueError/TypeError on bad input (never cached).
+    """
+    # Convert nanoseconds to whole seconds and format the UTC fields directly,
+    # without building a datetime
+    t = time.gmtime(int(nano_timestamp) // 1_000_000_000)
+    return f"{t.tm_year:04d}-{t.tm_mon:02d}-{t.tm_mday:02d}T{t.tm_hour:02d}:{t.tm_min:02d}:{t.tm_sec:02d}+00:00"
+
 def nano_to_iso(nano_timestamp: str) -> str:
     """Convert nanosecond timestamp to ISO 8601 format."""
     try:
-        # Convert nanoseconds to seconds
-        seconds = int(nano_timestamp) / 1_000_000_000
-        dt = datetime.fromtimestamp(seconds, tz=timezone.utc)
-        return dt.strftime("%Y-%m-%dT%H:%M:%S+00:00")
+        return cached_nano_to_iso(nano_timestamp)
     except (ValueError, TypeError):
-        return datetime.now(tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%S+00:00")
+        return datetime.now(tz=timezone.utc).isoformat(timespec="seconds")
 
-def extract_records_for_mongo(metrics: list) -> List[Dict[str, Any]]:
+def extract_records_for_mongo(metrics: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
     """
     Extract metrics and convert to final JSON format for MongoDB.
 
@@ -84,140 +203,167 @@ def extract_records_for_mongo(metrics: list) -> List[Dict[str, Any]]:
         version: string
     }
     """
-    # First pass: collect LOC data by call.id
-    loc_data = {}  # call.id -> {added: int, deleted: int, language: str, filepath: str, ...}
-
-    # Second pass: collect permission data and merge with LOC
-    records = []
+    # Single pass: collect LOC data by call.id and stash permission datapoints.
+    # LOC data is kept column-wise: call_rows maps call.id -> row index into
+    # the parallel columns below. Row 0 holds the defaults used for calls
+    # without LOC data, so lookups never need a separate miss branch.
+    call_rows = {}
+    added = array("q", [0])
+    deleted = array("q", [0])
+    languages = ["unknown"]
+    filepaths = ["unknown"]
+    models = ["unknown"]
+    users = ["unknown"]
+    versions = ["1.0.0"]
+    session_ids = ["unknown"]
+    permission_points = []  # (attrs, timeUnixNano) per permission datapoint
+    # Bound once; these run for every datapoint
+    get_row = call_rows.get
+    add_permission_point = permission_points.append
+
+    def new_row(call_id: str) -> int:
+        row = call_rows[call_id] = len(added)
+        added.append(0)
+        deleted.append(0)
+        languages.append("unknown")
+        filepaths.append("unknown")
+        models.append("unknown")
+        users.append("unknown")
+        versions.append("1.0.0")
+        session_ids.append("unknown")
+        return row
 
     for export in metrics:
-        resource_metrics = export.get("resourceMetrics", [])
-
-        for rm in resource_metrics:
-            scope_metrics = rm.get("scopeMetrics", [])
-
-            for sm in scope_metrics:
-                metrics_list = sm.get("metrics", [])
-
-                for metric in metrics_list:
-                    name = metric.get("name", "")
-
-                    # Collect LOC added data
-                    if name == "opencode.tool.loc.added":
-                        sum_data = metric.get("sum", {})
-                        data_points = sum_data.get("dataPoints", [])
-
-                        for dp in data_points:
-                            attrs = dp.get("attributes", [])
-                            call_id = get_attribute_value(attrs, "call.id")
-                            if call_id:
-                                if call_id not in loc_data:
-                                    loc_data[call_id] = {"added": 0, "deleted": 0}
-                                loc_data[call_id]["added"] = int(dp.get("asDouble", 0) or dp.get("asInt", 0))
-                                loc_data[call_id]["language"] = get_attribute_value(attrs, "language") or "unknown"
-                                loc_data[call_id]["filepath"] = get_attribute_value(attrs, "file.path") or "unknown"
-                                loc_data[call_id]["model"] = get_attribute_value(attrs, "model") or "unknown"
-                                loc_data[call_id]["user"] = get_attribute_value(attrs, "user") or "unknown"
-                                loc_data[call_id]["version"] = get_attribute_value(attrs, "version") or "1.0.0"
-                                loc_data[call_id]["session_id"] = get_attribute_value(attrs, "session.id") or "unknown"
-                                loc_data[call_id]["time"] = nano_to_iso(dp.get("timeUnixNano", ""))
-
-                    # Collect LOC deleted data
-                    elif name == "opencode.tool.loc.deleted":
-                        sum_data = metric.get("sum", {})
-                        data_points = sum_data.get("dataPoints", [])
-
-                        for dp in data_points:
-                            attrs = dp.get("attributes", [])
-                            call_id = get_attribute_value(attrs, "call.id")
-                            if call_id:
-                                if call_id not in loc_data:
-                                    loc_data[call_id] = {"added": 0, "deleted": 0}
-                                loc_data[call_id]["deleted"] = int(dp.get("asDouble", 0) or dp.get("asInt", 0))
-
-    # Second pass: process permission requests and create final records
-    for export in metrics:
-        resource_metrics = export.get("resourceMetrics", [])
-
-        for rm in resource_metrics:
-            scope_metrics = rm.get("scopeMetrics", [])
-
-            for sm in scope_metrics:
-                metrics_list = sm.get("metrics", [])
-
-                for metric in metrics_list:
-                    name = metric.get("name", "")
-
-                    if name == "opencode.permission.requests":
-                        sum_data = metric.get("sum", {})
-                        data_points = sum_data.get("dataPoints", [])
-
-                        for dp in data_points:
-                            attrs = dp.get("attributes", [])
-                            call_id = get_attribute_value(attrs, "call.id")
-                            reply = get_attribute_value(attrs, "permission.reply")
-                            auto_approve = get_attribute_value(attrs, "auto_approve_edit")
-
-                            # Determine accept status
-                            # reply_type values: "once", "always", "auto", "reject"
-                            # - "once" = user clicked accept once (dialog shown)
-                            # - "always" = user clicked accept always (dialog shown)
-                            # - "auto" = no dialog shown, system auto-approved
-                            # - "reject" = user rejected
-                            # Also support legacy values: "accept", "auto_accept"
-                            is_accepted = reply in ["once", "always", "auto", "accept", "auto_accept"]
-
-                            # Get LOC data for this call
-                            loc = loc_data.get(call_id, {})
-                            ai_loc = loc.get("added", 0) if is_accepted else 0
-
-                            # Build final record
-                            record = {
-                                "accept": is_accepted,
-                                "ai_loc": ai_loc,
-                                "ai_char": 0,  # Hardcoded
-                                "auto_approve_edit": auto_approve == "true",
-                                "completion_tokens": 0,  # Hardcoded
-                                "effective": True,  # Hardcoded
-                                "filepath": get_attribute_value(attrs, "file.path") or loc.get("filepath", "unknown"),
-                                "function_category": "opencode",  # Hardcoded
-                                "language": get_attribute_value(attrs, "language") or loc.get("language", "unknown"),
-                                "model": get_attribute_value(attrs, "model") or loc.get("model", "unknown"),
-                                "prompt_tokens": 0,  # Hardcoded
-                                "sid": get_attribute_value(attrs, "session.id") or loc.get("session_id", "unknown"),
-                                "time": nano_to_iso(dp.get("timeUnixNano", "")),
-                                "user": get_attribute_value(attrs, "user") or loc.get("user", "unknown"),
-                                "user_char": 0,  # Hardcoded
-                                "user_loc": 0,  # Hardcoded
-                                "version": get_attribute_value(attrs, "version") or loc.get("version", "1.0.0"),
-                                # Extra fields for debugging (optional)
-                                "call_id": call_id,
-                                "reply_type": reply,
-                            }
-
-                            records.append(record)
-
-    return records
-
-def send_to_mongodb(records: List[Dict[str, Any]], mongo_uri: str = "mongodb://localhost:27017", db_name: str = "opencode_telemetry", collection_name: str = "metrics"):
-    """Send records to MongoDB."""
+        for name, data_points in iter_metric_datapoints(export, RECORD_METRICS):
+            # Collect LOC added data
+            # Decoded names are not interned, so `is` would never match; == is
+            # cheap here anyway as the three names differ in length
+            if name == METRIC_LOC_ADDED:
+                for dp in data_points:
+                    attrs = attributes_to_dict(dp.get("attributes", []))
+                    call_id = attrs.get(ATTR_CALL_ID)
+                    if call_id:
+                        row = get_row(call_id)
+                        if row is None:
+                            row = new_row(call_id)
+                        get_attr = attrs.get
+                        added[row] = int(dp.get("asDouble", 0) or dp.get("asInt", 0))
+                        filepaths[row] = get_attr(ATTR_FILE_PATH) or "unknown"
+                        # These repeat across most calls; intern them so the
+                        # columns share one string per distinct value
+                        languages[row] = intern_value(get_attr(ATTR_LANGUAGE) or "unknown")
+                        models[row] = intern_value(get_attr(ATTR_MODEL) or "unknown")
+                        users[row] = intern_value(get_attr(ATTR_USER) or "unknown")
+                        versions[row] = intern_value(get_attr(ATTR_VERSION) or "1.0.0")
+                        session_ids[row] = intern_value(get_attr(ATTR_SESSION_ID) or "unknown")
+
+            # Collect LOC deleted data
+            elif name == METRIC_LOC_DELETED:
+                for dp in data_points:
+                    # Only call.id is needed here, so skip converting the rest
+                    call_id = get_attribute(dp.get("attributes", ()), ATTR_CALL_ID)
+                    if call_id:
+                        row = get_row(call_id)
+                        if row is None:
+                            row = new_row(call_id)
+                        deleted[row] = int(dp.get("asDouble", 0) or dp.get("asInt", 0))
+
+            # Permission records need the complete LOC data, so build them
+            # afterwards. Only what the record needs is buffered (not the
+            # datapoint), so each streamed export can be freed after its pass.
+            elif name == METRIC_PERMISSION_REQUESTS:
+                for dp in data_points:
+                    add_permission_point((attributes_to_dict(dp.get("attributes", [])), dp.get("timeUnixNano", "")))
+
+    # Process permission requests and yield the final records
+    for attrs, time_unix_nano in permission_points:
+        get_attr = attrs.get
+        call_id = get_attr(ATTR_CALL_ID)
+        reply = get_attr(ATTR_PERMISSION_REPLY)
+        auto_approve = get_attr(ATTR_AUTO_APPROVE_EDIT)
+
+        # Determine accept status
+        # reply_type values: "once", "always", "auto", "reject"
+        # - "once" = user clicked accept once (dialog shown)
+        # - "always" = user clicked accept always (dialog shown)
+        # - "auto" = no dialog shown, system auto-approved
+        # - "reject" = user rejected
+        # Also support legacy values: "accept", "auto_accept"
+        is_accepted = reply in ["once", "always", "auto", "accept", "auto_accept"]
+
+        # Get LOC data for this call (row 0 = no LOC data recorded)
+        row = get_row(call_id, 0)
+        ai_loc = added[row] if is_accepted else 0
+
+        # Build final record
+        record = {
+            "accept": is_accepted,
+            "ai_loc": ai_loc,
+            "ai_char": 0,  # Hardcoded
+            "auto_approve_edit": auto_approve == "true",
+            "completion_tokens": 0,  # Hardcoded
+            "effective": True,  # Hardcoded
+            "filepath": get_attr(ATTR_FILE_PATH) or filepaths[row],
+            "function_category": "opencode",  # Hardcoded
+            "language": get_attr(ATTR_LANGUAGE) or languages[row],
+            "model": get_attr(ATTR_MODEL) or models[row],
+            "prompt_tokens": 0,  # Hardcoded
+            "sid": get_attr(ATTR_SESSION_ID) or session_ids[row],
+            "time": nano_to_iso(time_unix_nano),
+            "user": get_attr(ATTR_USER) or users[row],
+            "user_char": 0,  # Hardcoded
+            "user_loc": 0,  # Hardcoded
+            "version": get_attr(ATTR_VERSION) or versions[row],
+            # Extra fields for debugging (optional)
+            "call_id": call_id,
+            "reply_type": reply,
+        }
+
+        yield record
+
+def send_to_mongodb(records: Iterable[Dict[str, Any]], mongo_uri: str = "mongodb://localhost:27017", db_name: str = "opencode_telemetry", collection_name: str = "metrics"):
+    """
+    Send records to MongoDB.
+
+    records may be any iterable (e.g. the extract_records_for_mongo
+    generator); it is pulled INSERT_BATCH_SIZE records at a time.
+    """
+    # Check for records first, so an empty run needs no pymongo
+    records = iter(records)
+    batches = iter(lambda: list(islice(records, INSERT_BATCH_SIZE)), [])
+    first_batch = next(batches, None)
+    if first_batch is None:
+        print("No records to send to MongoDB.")
+        return 0
+
     try:
         from pymongo import MongoClient
     except ImportError:
         print("Error: pymongo is not installed. Install it with: pip install pymongo")
         sys.exit(1)
 
-    if not records:
-        print("No records to send to MongoDB.")
-        return 0
-
-    client = MongoClient(mongo_uri)
+    # Compressed wire protocol, with enough pooled connections for the
+    # concurrent batch inserts below
+    client = MongoClient(mongo_uri, compressors=MONGO_COMPRESSORS, maxPoolSize=INSERT_WORKERS * 2)
     db = client[db_name]
     collection = db[collection_name]
 
-    # Insert records
-    result = collection.insert_many(records)
-    inserted_count = len(result.inserted_ids)
+    def insert_batch(batch: List[Dict[str, Any]]) -> int:
+        return len(collection.insert_many(batch, ordered=False).inserted_ids)
+
+    # Insert records in fixed-size batches; unordered so the server can apply
+    # each batch in parallel and one bad document doesn't stop the rest.
+    # Up to INSERT_WORKERS batches are in flight at once so BSON encoding
+    # overlaps the RTT, without buffering the whole stream.
+    inserted_count = 0
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=INSERT_WORKERS) as executor:
+        for batch in chain([first_batch], batches):
+            if len(pending) >= INSERT_WORKERS:
+                inserted_count += pending.popleft().result()
+            pending.append(executor.submit(insert_batch, batch))
+        for future in pending:
+            inserted_count += future.result()
 
     print(f"Successfully inserted {inserted_count} records into MongoDB.")
     print(f"  Database: {db_name}")
@@ -226,82 +372,138 @@ def send_to_mongodb(records: List[Dict[str, Any]], mongo_uri: str = "mongodb://l
     client.close()
     return inserted_count
 
-def analyze_metrics(metrics: list) -> Dict[str, Any]:
+def handle_permission_requests(data_points: list, results: Dict[str, Any]) -> None:
+    """Count permission replies and the sessions they came from."""
+    permissions = results["permissions"]
+    session_ids = []
+    for dp in data_points:
+        # Only two keys are needed, so unwrap just those in one pass
+        reply = session_id = None
+        for attr in dp.get("attributes", ()):
+            key = attr.get("key")
+            if key == ATTR_PERMISSION_REPLY:
+                reply = get_value(attr.get("value", EMPTY))
+            elif key == ATTR_SESSION_ID:
+                session_id = get_value(attr.get("value", EMPTY))
+        count = dp.get("asDouble", 0) or dp.get("asInt", 0)
+
+        if reply:
+            permissions[reply] = permissions.get(reply, 0) + int(count)
+        session_ids.append(session_id)
+
+    # One bulk set update per metric instead of an add() per datapoint
+    results["sessions"].update(filter(None, session_ids))
+
+def handle_loc_added(data_points: list, results: Dict[str, Any]) -> None:
+    """Sum LOC added (only recorded for accepted edits)."""
+    loc_by_language = results["loc_by_language"]
+    total = 0  # summed locally, stored into results once per metric
+    for dp in data_points:
+        count = int(dp.get("asDouble", 0) or dp.get("asInt", 0))
+        language = get_attribute(dp.get("attributes", ()), ATTR_LANGUAGE) or "unknown"
+
+        total += count
+        by_language = loc_by_language.get(language)
+        if by_language is None:
+            by_language = loc_by_language[language] = {"added": 0, "deleted": 0}
+        by_language["added"] += count
+    results["loc_added"] += total
+
+def handle_loc_deleted(data_points: list, results: Dict[str, Any]) -> None:
+    """Sum LOC deleted (only recorded for accepted edits)."""
+    loc_by_language = results["loc_by_language"]
+    total = 0  # summed locally, stored into results once per metric
+    for dp in data_points:
+        count = int(dp.get("asDouble", 0) or dp.get("asInt", 0))
+        language = get_attribute(dp.get("attributes", ()), ATTR_LANGUAGE) or "unknown"
+
+        total += count
+        by_language = loc_by_language.get(language)
+        if by_language is None:
+            by_language = loc_by_language[language] = {"added": 0, "deleted": 0}
+        by_language["deleted"] += count
+    results["loc_deleted"] += total
+
+# Metric name -> handler used by analyze_metrics()
+METRIC_HANDLERS = {
+    METRIC_PERMISSION_REQUESTS: handle_permission_requests,
+    METRIC_LOC_ADDED: handle_loc_added,
+    METRIC_LOC_DELETED: handle_loc_deleted,
+}
+
+def analyze_metrics(metrics: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
     """
     Analyze metrics to extract:
     - Permission acceptance/rejection counts
     - LOC added/deleted (accepted only)
+
+    Consumes the exports in a single pass, so a streaming iterator works.
     """
     results = {
-        "permissions": defaultdict(int),  # reply_type -> count
+        "exports": 0,
+        "permissions": {},  # reply_type -> count
         "loc_added": 0,
         "loc_deleted": 0,
-        "loc_by_language": defaultdict(lambda: {"added": 0, "deleted": 0}),
+        "loc_by_language": {},  # language -> {"added": int, "deleted": int}
         "sessions": set(),
     }
-
     for export in metrics:
-        resource_metrics = export.get("resourceMetrics", [])
-
-        for rm in resource_metrics:
-            scope_metrics = rm.get("scopeMetrics", [])
-
-            for sm in scope_metrics:
-                metrics_list = sm.get("metrics", [])
+        results["exports"] += 1
+        for name, data_points in iter_metric_datapoints(export, METRIC_HANDLERS):
+            METRIC_HANDLERS[name](data_points, results)
 
-                for metric in metrics_list:
-                    name = metric.get("name", "")
-
-                    # Process permission requests
-                    if name == "opencode.permission.requests":
-                        sum_data = metric.get("sum", {})
-                        data_points = sum_data.get("dataPoints", [])
-
-                        for dp in data_points:
-                            attrs = dp.get("attributes", [])
-                            reply = get_attribute_value(attrs, "permission.reply")
-                            count = dp.get("asDouble", 0) or dp.get("asInt", 0)
-                            session_id = get_attribute_value(attrs, "session.id")
-
-                            if reply:
-                                results["permissions"][reply] += int(count)
-                            if session_id:
-                                results["sessions"].add(session_id)
-
-                    # Process LOC added (only recorded for accepted edits)
-                    elif name == "opencode.tool.loc.added":
-                        sum_data = metric.get("sum", {})
-                        data_points = sum_data.get("dataPoints", [])
-
-                        for dp in data_points:
-                            attrs = dp.get("attributes", [])
-                            count = dp.get("asDouble", 0) or dp.get("asInt", 0)
-                            language = get_attribute_value(attrs, "language") or "unknown"
-
-                            results["loc_added"] += int(count)
-                            results["loc_by_language"][language]["added"] += int(count)
-
-                    # Process LOC deleted (only recorded for accepted edits)
-                    elif name == "opencode.tool.loc.deleted":
-                        sum_data = metric.get("sum", {})
-                        data_points = sum_data.get("dataPoints", [])
+    return results
 
-                        for dp in data_points:
-                            attrs = dp.get("attributes", [])
-                            count = dp.get("asDouble", 0) or dp.get("asInt", 0)
-                            language = get_attribute_value(attrs, "language") or "unknown"
+def analyze_metrics_range(filepath: str, start: int, end: int) -> Dict[str, Any]:
+    """Worker entry point: analyze the exports in one byte range of the file."""
+    return analyze_metrics(iter_jsonl_file(filepath, start, end))
+
+def merge_results(parts: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine per-range analyze_metrics() results into one."""
+    merged = parts[0]
+    permissions = merged["permissions"]
+    loc_by_language = merged["loc_by_language"]
+    for part in parts[1:]:
+        merged["exports"] += part["exports"]
+        merged["loc_added"] += part["loc_added"]
+        merged["loc_deleted"] += part["loc_deleted"]
+        merged["sessions"] |= part["sessions"]
+        for reply, count in part["permissions"].items():
+            permissions[reply] = permissions.get(reply, 0) + count
+        for language, counts in part["loc_by_language"].items():
+            by_language = loc_by_language.get(language)
+            if by_language is None:
+                loc_by_language[language] = counts
+            else:
+                by_language["added"] += counts["added"]
+                by_language["deleted"] += counts["deleted"]
+    return merged
+
+def analyze_metrics_file(filepath: str, jobs: int = 1) -> Dict[str, Any]:
+    """
+    Analyze a metrics.jsonl file, sharding it across `jobs` processes.
 
-                            results["loc_deleted"] += int(count)
-                            results["loc_by_language"][language]["deleted"] += int(count)
+    Every line is an independent export, so byte ranges split on line
+    boundaries can be analyzed in parallel and merged. Files smaller than
+    PARALLEL_MIN_BYTES are read in-process, where start-up would dominate.
+    """
+    if jobs <= 1 or os.path.getsize(filepath) < PARALLEL_MIN_BYTES:
+        return analyze_metrics(iter_jsonl_file(filepath))
 
-    return results
+    ranges = split_file(filepath, jobs)
+    # Flush first so forked workers don't inherit (and re-emit) buffered output
+    sys.stdout.flush()
+    with ProcessPoolExecutor(max_workers=len(ranges)) as executor:
+        futures = [executor.submit(analyze_metrics_range, filepath, start, end) for start, end in ranges]
+        return merge_results([future.result() for future in futures])
 
 def print_report(results: Dict[str, Any]):
     """Print a formatted report of the metrics analysis."""
-    print("=" * 60)
-    print("       OPENCODE TELEMETRY METRICS REPORT")
-    print("=" * 60)
-    print()
+    out = []
+    out.append("=" * 60)
+    out.append("       OPENCODE TELEMETRY METRICS REPORT")
+    out.append("=" * 60)
+    out.append("")
 
     # Permission stats
     # New values: "once", "always", "auto", "reject"
@@ -319,59 +521,61 @@ def print_report(results: Dict[str, Any]):
     total_requests = manual_once + manual_always + auto_approved + rejected
     total_accepted = manual_once + manual_always + auto_approved
 
-    print("1. EDIT REQUESTS ACCEPTANCE RATE")
-    print("-" * 40)
-    print(f"   Manual (once):   {manual_once:>6}  <- user clicked 'Accept'")
-    print(f"   Manual (always): {manual_always:>6}  <- user clicked 'Always'")
-    print(f"   Auto-approved:   {auto_approved:>6}  <- no dialog shown")
-    print(f"   Rejected:        {rejected:>6}")
-    print(f"   Total:           {total_requests:>6}")
-    print()
+    out.append("1. EDIT REQUESTS ACCEPTANCE RATE")
+    out.append("-" * 40)
+    out.append(f"   Manual (once):   {manual_once:>6}  <- user clicked 'Accept'")
+    out.append(f"   Manual (always): {manual_always:>6}  <- user clicked 'Always'")
+    out.append(f"   Auto-approved:   {auto_approved:>6}  <- no dialog shown")
+    out.append(f"   Rejected:        {rejected:>6}")
+    out.append(f"   Total:           {total_requests:>6}")
+    out.append("")
 
     if total_requests > 0:
         acceptance_rate = total_accepted / total_requests * 100
-        print(f"   ACCEPTANCE RATE: {acceptance_rate:.1f}%")
-        print(f"   ({total_accepted} accepted out of {total_requests} requests)")
+        out.append(f"   ACCEPTANCE RATE: {acceptance_rate:.1f}%")
+        out.append(f"   ({total_accepted} accepted out of {total_requests} requests)")
     else:
-        print("   ACCEPTANCE RATE: N/A (no requests)")
-    print()
+        out.append("   ACCEPTANCE RATE: N/A (no requests)")
+    out.append("")
 
     # LOC stats
     loc_added = results["loc_added"]
     loc_deleted = results["loc_deleted"]
     net_loc = loc_added - loc_deleted
 
-    print("2. TOTAL LINES OF CODE ACCEPTED")
-    print("-" * 40)
-    print(f"   Lines Added:   +{loc_added:>6}")
-    print(f"   Lines Deleted: -{loc_deleted:>6}")
-    print(f"   Net Change:    {net_loc:>+7}")
-    print()
+    out.append("2. TOTAL LINES OF CODE ACCEPTED")
+    out.append("-" * 40)
+    out.append(f"   Lines Added:   +{loc_added:>6}")
+    out.append(f"   Lines Deleted: -{loc_deleted:>6}")
+    out.append(f"   Net Change:    {net_loc:>+7}")
+    out.append("")
 
     # LOC by language
     if results["loc_by_language"]:
-        print("3. LOC BY PROGRAMMING LANGUAGE")
-        print("-" * 40)
-        for lang, counts in sorted(results["loc_by_language"].items()):
-            added = counts["added"]
-            deleted = counts["deleted"]
-            print(f"   {lang:>12}: +{added:<4} -{deleted:<4} (net: {added - deleted:+d})")
-    print()
+        out.append("3. LOC BY PROGRAMMING LANGUAGE")
+        out.append("-" * 40)
+        out.extend(
+            f"   {lang:>12}: +{counts['added']:<4} -{counts['deleted']:<4} (net: {counts['added'] - counts['deleted']:+d})"
+            for lang, counts in sorted(results["loc_by_language"].items())
+        )
+    out.append("")
 
     # Session info
-    print("4. SESSION INFO")
-    print("-" * 40)
-    print(f"   Unique sessions: {len(results['sessions'])}")
-    print()
-
-    print("=" * 60)
-    print("  KEY METRICS FOR MANAGEMENT:")
-    print("=" * 60)
+    out.append("4. SESSION INFO")
+    out.append("-" * 40)
+    out.append(f"   Unique sessions: {len(results['sessions'])}")
+    out.append("")
+
+    out.append("=" * 60)
+    out.append("  KEY METRICS FOR MANAGEMENT:")
+    out.append("=" * 60)
     if total_requests > 0:
-        print(f"  * Acceptance Rate: {acceptance_rate:.1f}%")
-    print(f"  * Total LOC Accepted: +{loc_added} / -{loc_deleted}")
-    print(f"  * Net Code Change: {net_loc:+d} lines")
-    print("=" * 60)
+        out.append(f"  * Acceptance Rate: {acceptance_rate:.1f}%")
+    out.append(f"  * Total LOC Accepted: +{loc_added} / -{loc_deleted}")
+    out.append(f"  * Net Code Change: {net_loc:+d} lines")
+    out.append("=" * 60)
+
+    sys.stdout.write("\n".join(out) + "\n")
 
 def main():
     parser = argparse.ArgumentParser(
@@ -419,6 +623,12 @@ Examples:
         default=False,
         help="Print report even when --to-mongo is used"
     )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=max(1, (os.cpu_count() or 2) // 2),
+        help="Worker processes for the report on large files (default: half the CPUs)"
+    )
     parser.add_argument(
         "--show-records",
         action="store_true",
@@ -432,17 +642,27 @@ Examples:
     print()
 
     try:
-        metrics = parse_metrics_file(args.filepath)
-        print(f"Loaded {len(metrics)} metric exports")
-        print()
-
         if args.to_mongo:
+            # Stream the exports into the conversion, counting them on the way
+            export_count = 0
+
+            def counted_exports():
+                nonlocal export_count
+                for export in iter_jsonl_file(args.filepath):
+                    export_count += 1
+                    yield export
+
             # Convert to final JSON format and send to MongoDB
-            records = extract_records_for_mongo(metrics)
-            print(f"Converted to {len(records)} records for MongoDB")
-            print()
+            records = extract_records_for_mongo(counted_exports())
 
             if args.show_records:
+                # Debug only: keep the records so they can be printed first
+                records = list(records)
+                print(f"Loaded {export_count} metric exports")
+                print()
+                print(f"Converted to {len(records)} records for MongoDB")
+                print()
+
                 print("Records to be inserted:")
                 print("-" * 40)
                 for i, record in enumerate(records, 1):
@@ -450,21 +670,27 @@ Examples:
                     print(json.dumps(record, indent=2))
                     print()
 
-            if records:
-                send_to_mongodb(
-                    records,
-                    mongo_uri=args.mongo_uri,
-                    db_name=args.db_name,
-                    collection_name=args.collection
-                )
+            # Records are pulled from the generator batch by batch
+            inserted_count = send_to_mongodb(
+                records,
+                mongo_uri=args.mongo_uri,
+                db_name=args.db_name,
+                collection_name=args.collection
+            )
+
+            if not args.show_records:
+                print(f"  Converted {export_count} metric exports into {inserted_count} records")
 
             if args.print_report:
                 print()
-                results = analyze_metrics(metrics)
+                # The exports were not kept, so re-read the file for the report
+                results = analyze_metrics_file(args.filepath, args.jobs)
                 print_report(results)
         else:
-            # Default: analyze and print report
-            results = analyze_metrics(metrics)
+            # Default: stream the file straight into the analysis
+            results = analyze_metrics_file(args.filepath, args.jobs)
+            print(f"Loaded {results['exports']} metric exports")
+            print()
             print_report(results)
 
     except FileNotFoundError:
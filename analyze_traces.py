@@ -16,76 +16,106 @@ Usage:
 
 import argparse
 import json
+import os
 import sys
-from collections import defaultdict, Counter
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timezone
-from typing import Dict, Any, List, Optional
-
-def parse_traces_file(filepath: str) -> list:
-    """Read and parse the JSONL traces file."""
-    traces = []
-    with open(filepath, 'r') as f:
-        for line in f:
-            line = line.strip()
-            if line:
-                try:
-                    traces.append(json.loads(line))
-                except json.JSONDecodeError as e:
-                    print(f"Warning: Skipping invalid JSON line: {e}")
-    return traces
+from functools import lru_cache
+from itertools import chain, islice
+from typing import Dict, Any, Iterable, Iterator, List, Tuple
+
+from analyze_metrics import iter_jsonl_file, split_file
+
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+# Records per insert_many call when sending to MongoDB
+INSERT_BATCH_SIZE = 1000
+
+# Shared read-only fallback for attributes without a value
+EMPTY = {}
+
+# Traces files below this size are never split across processes
+PARALLEL_MIN_BYTES = 32 * 1024 * 1024
+
+def unwrap_value(value: dict) -> Any:
+    """Unwrap an OTEL attribute value union."""
+    # An ordered ladder rather than a {kind: converter} dispatch: stringValue,
+    # by far the most common kind, costs a single membership test this way
+    if "stringValue" in value:
+        return value["stringValue"]
+    elif "intValue" in value:
+        return int(value["intValue"])
+    elif "doubleValue" in value:
+        return float(value["doubleValue"])
+    elif "boolValue" in value:
+        return value["boolValue"]
+    return None
 
 def get_attribute_value(attributes: list, key: str) -> Any:
     """Extract attribute value by key from OTEL attributes list."""
     for attr in attributes:
         if attr.get("key") == key:
-            value = attr.get("value", {})
-            if "stringValue" in value:
-                return value["stringValue"]
-            elif "intValue" in value:
-                return int(value["intValue"])
-            elif "doubleValue" in value:
-                return float(value["doubleValue"])
-            elif "boolValue" in value:
-                return value["boolValue"]
+            return unwrap_value(attr.get("value", EMPTY))
     return None
 
+def attributes_by_key(attributes: list) -> Dict[str, dict]:
+    """
+    Map attribute keys to their (still wrapped) values in one pass.
+
+    Built in reverse so the first occurrence of a key wins, as with
+    get_attribute_value.
+    """
+    return {attr["key"]: attr.get("value", EMPTY) for attr in reversed(attributes)}
+
+def resolve(attrs: Dict[str, dict], key: str) -> Any:
+    """get_attribute_value() for a dict from attributes_by_key(): O(1) per key."""
+    value = attrs.get(key)
+    return None if value is None else unwrap_value(value)
+
+@lru_cache(maxsize=4096)
+def seconds_to_iso(seconds: int) -> str:
+    """
+    Format whole UTC seconds as ISO 8601.
+
+    Spans arrive in bursts that share their second, so most calls are cache
+    hits even though the nanosecond timestamps are all distinct.
+    """
+    t = time.gmtime(seconds)
+    return f"{t.tm_year:04d}-{t.tm_mon:02d}-{t.tm_mday:02d}T{t.tm_hour:02d}:{t.tm_min:02d}:{t.tm_sec:02d}+00:00"
+
 def nano_to_iso(nano_timestamp: str) -> str:
     """Convert nanosecond timestamp to ISO 8601 format."""
     try:
-        seconds = int(nano_timestamp) / 1_000_000_000
-        dt = datetime.fromtimestamp(seconds, tz=timezone.utc)
-        return dt.strftime("%Y-%m-%dT%H:%M:%S+00:00")
+        return seconds_to_iso(int(nano_timestamp) // 1_000_000_000)
     except (ValueError, TypeError):
         return datetime.now(tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%S+00:00")
 
-def has_attribute(span, attr_key):
-    """Check if span has a specific attribute key."""
-    for attr in span.get("attributes", []):
-        if attr.get("key") == attr_key:
-            return True
-    return False
-
-def is_tool_call_span(span):
-    """Robust detection of tool call spans using attributes, not span name."""
-    # Method 1: Check operation.name
-    operation_name = get_attribute_value(span.get("attributes", []), "operation.name")
-    if operation_name and "toolCall" in operation_name:
-        return True
-
-    # Method 2: Check ai.operationId
-    operation_id = get_attribute_value(span.get("attributes", []), "ai.operationId")
-    if operation_id and "toolCall" in operation_id:
-        return True
-
-    # Method 3: Check for ai.toolCall.id attribute (definitive)
-    return has_attribute(span, "ai.toolCall.id")
-
-def is_prompt_span(span):
-    """Robust detection of spans containing prompts using attribute presence."""
-    # Check for prompt attributes (not span name)
-    return has_attribute(span, "ai.prompt.messages") or has_attribute(span, "ai.prompt")
-
-def extract_prompt_records(traces: list) -> List[Dict[str, Any]]:
+def classify_span(attrs: Dict[str, dict]) -> Tuple[bool, bool]:
+    """
+    Classify a span from its attributes_by_key() dict, using attributes
+    rather than span names.
+
+    Returns (is_tool_call, is_prompt).
+    """
+    # Tool call: operation.name / ai.operationId mention toolCall, or the
+    # definitive ai.toolCall.id attribute is present
+    operation_name = resolve(attrs, "operation.name")
+    operation_id = resolve(attrs, "ai.operationId")
+    is_tool_call = bool(
+        (operation_name and "toolCall" in operation_name)
+        or (operation_id and "toolCall" in operation_id)
+        or "ai.toolCall.id" in attrs
+    )
+    # Prompt: carries the prompt attributes
+    is_prompt = "ai.prompt.messages" in attrs or "ai.prompt" in attrs
+    return is_tool_call, is_prompt
+
+def extract_prompt_records(traces: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """
     Extract trace spans and convert to prompt records for MongoDB.
 
@@ -95,91 +125,112 @@ def extract_prompt_records(traces: list) -> List[Dict[str, Any]]:
     3. Find prompt spans using ATTRIBUTE presence (not hardcoded span names)
     4. Combine using call_id as join key
     """
-    records = []
-
-    # First pass: organize spans by traceId
-    traces_by_id = defaultdict(list)
+    return list(iter_prompt_records(group_trace_spans(traces)))
+
+def group_trace_spans(traces: Iterable[Dict[str, Any]]) -> Dict[str, list]:
+    """First pass of extract_prompt_records(): group the spans by traceId."""
+    # Organize spans by traceId, classifying each span as it is
+    # seen. Only what the second pass reads is kept per trace: the attribute
+    # dict and raw start/end times of each tool call span, and the attribute dict
+    # of the first prompt span. The span dicts themselves can be freed.
+    # OTEL batching can split one trace across exports, so the grouping has
+    # to cover the whole stream rather than each export on its own.
+    traces_by_id = {}  # trace_id -> [[(start, end, attrs)] tool calls, first prompt attrs or None]
 
     for export in traces:
         for rs in export.get("resourceSpans", []):
             for ss in rs.get("scopeSpans", []):
                 for span in ss.get("spans", []):
                     trace_id = span.get("traceId")
-                    traces_by_id[trace_id].append(span)
-
-    # Second pass: correlate spans within each trace
-    for trace_id, spans in traces_by_id.items():
-        # Find tool call spans using robust detection
-        tool_call_spans = [s for s in spans if is_tool_call_span(s)]
-        # Find prompt spans using attribute presence
-        prompt_spans = [s for s in spans if is_prompt_span(s)]
-
+                    group = traces_by_id.get(trace_id)
+                    if group is None:
+                        # Interned so every record of the trace shares the key
+                        if isinstance(trace_id, str):
+                            trace_id = sys.intern(trace_id)
+                        group = traces_by_id[trace_id] = [[], None]
+
+                    attrs = attributes_by_key(span.get("attributes", []))
+                    is_tool_call, is_prompt = classify_span(attrs)
+                    if is_tool_call:
+                        group[0].append((span.get("startTimeUnixNano"), span.get("endTimeUnixNano"), attrs))
+                    if is_prompt and group[1] is None:
+                        group[1] = attrs
+
+    return traces_by_id
+
+def iter_prompt_records(traces_by_id: Dict[str, list]) -> Iterator[Dict[str, Any]]:
+    """Second pass of extract_prompt_records(): yield one record per tool call span."""
+    # Correlate spans within each trace
+    for trace_id, (tool_call_spans, prompt_attrs) in traces_by_id.items():
         if not tool_call_spans:
             continue
 
         # Get prompt data from prompt span (if available)
         prompt_data = {}
-        if prompt_spans:
+        if prompt_attrs is not None:
             # Use first prompt span (or could find best one by timestamp)
-            prompt_span = prompt_spans[0]
-            attrs = {a["key"]: a.get("value", {}) for a in prompt_span.get("attributes", [])}
+            attrs = prompt_attrs
 
             # Extract prompt (try both attribute keys)
-            prompt_json = get_attribute_value(prompt_span.get("attributes", []), "ai.prompt.messages") or \
-                         get_attribute_value(prompt_span.get("attributes", []), "ai.prompt")
+            prompt_json = resolve(attrs, "ai.prompt.messages") or \
+                         resolve(attrs, "ai.prompt")
 
             if prompt_json:
                 try:
                     if isinstance(prompt_json, str):
-                        prompt_data["prompt_messages"] = json.loads(prompt_json)
+                        prompt_data["prompt_messages"] = json_loads(prompt_json)
                     else:
                         prompt_data["prompt_messages"] = prompt_json
                 except:
                     prompt_data["prompt_messages_raw"] = str(prompt_json)
 
             # Extract other fields
-            prompt_data["response_text"] = get_attribute_value(prompt_span.get("attributes", []), "ai.response.text")
-            prompt_data["prompt_tokens"] = get_attribute_value(prompt_span.get("attributes", []), "ai.usage.inputTokens") or 0
-            prompt_data["completion_tokens"] = get_attribute_value(prompt_span.get("attributes", []), "ai.usage.outputTokens") or 0
-            prompt_data["model"] = get_attribute_value(prompt_span.get("attributes", []), "gen_ai.request.model") or "unknown"
-            prompt_data["provider"] = get_attribute_value(prompt_span.get("attributes", []), "gen_ai.system") or "unknown"
-            prompt_data["temperature"] = get_attribute_value(prompt_span.get("attributes", []), "gen_ai.request.temperature")
-            prompt_data["max_tokens"] = get_attribute_value(prompt_span.get("attributes", []), "gen_ai.request.max_tokens")
+            prompt_data["response_text"] = resolve(attrs, "ai.response.text")
+            prompt_data["prompt_tokens"] = resolve(attrs, "ai.usage.inputTokens") or 0
+            prompt_data["completion_tokens"] = resolve(attrs, "ai.usage.outputTokens") or 0
+            prompt_data["model"] = resolve(attrs, "gen_ai.request.model") or "unknown"
+            prompt_data["provider"] = resolve(attrs, "gen_ai.system") or "unknown"
+            prompt_data["temperature"] = resolve(attrs, "gen_ai.request.temperature")
+            prompt_data["max_tokens"] = resolve(attrs, "gen_ai.request.max_tokens")
+
+        # Extract user prompt from messages (shared by every toolCall in the trace)
+        user_prompt = ""
+        if "prompt_messages" in prompt_data:
+            for msg in prompt_data["prompt_messages"]:
+                if msg.get("role") == "user":
+                    content = msg.get("content")
+                    if isinstance(content, str):
+                        user_prompt = content
+                    elif isinstance(content, list):
+                        user_prompt = " ".join([c.get("text", "") for c in content if c.get("type") == "text"])
+                    break
+
+        # Token totals are per trace, so add them up once rather than per record
+        prompt_tokens = prompt_data.get("prompt_tokens", 0)
+        completion_tokens = prompt_data.get("completion_tokens", 0)
+        total_tokens = prompt_tokens + completion_tokens
 
         # Create record for each toolCall
-        for tc_span in tool_call_spans:
-            attrs = {a["key"]: a.get("value", {}) for a in tc_span.get("attributes", [])}
-
-            # Extract user prompt from messages
-            user_prompt = ""
-            if "prompt_messages" in prompt_data:
-                for msg in prompt_data["prompt_messages"]:
-                    if msg.get("role") == "user":
-                        content = msg.get("content")
-                        if isinstance(content, str):
-                            user_prompt = content
-                        elif isinstance(content, list):
-                            user_prompt = " ".join([c.get("text", "") for c in content if c.get("type") == "text"])
-                        break
-
-            # Use get_attribute_value for all extractions (handles OTLP value union)
-            call_id = get_attribute_value(tc_span.get("attributes", []), "ai.toolCall.id") or \
-                     get_attribute_value(tc_span.get("attributes", []), "call.id") or "unknown"
-
-            tool_name = get_attribute_value(tc_span.get("attributes", []), "ai.toolCall.name") or \
-                       get_attribute_value(tc_span.get("attributes", []), "tool.name") or "unknown"
-
-            tool_args = get_attribute_value(tc_span.get("attributes", []), "ai.toolCall.args") or "{}"
+        for start_time, end_time, attrs in tool_call_spans:
+
+            # Use resolve for all extractions (handles OTLP value union)
+            call_id = resolve(attrs, "ai.toolCall.id") or \
+                     resolve(attrs, "call.id") or "unknown"
+
+            tool_name = resolve(attrs, "ai.toolCall.name") or \
+                       resolve(attrs, "tool.name") or "unknown"
+
+            tool_args = resolve(attrs, "ai.toolCall.args") or "{}"
 
             # Extract session context (if injected by plugin)
-            session_id = get_attribute_value(tc_span.get("attributes", []), "session.id")
-            user = get_attribute_value(tc_span.get("attributes", []), "user")
-            file_path = get_attribute_value(tc_span.get("attributes", []), "file.path")
-            language = get_attribute_value(tc_span.get("attributes", []), "language")
+            session_id = resolve(attrs, "session.id")
+            user = resolve(attrs, "user")
+            file_path = resolve(attrs, "file.path")
+            language = resolve(attrs, "language")
 
             # Calculate duration
-            start_nano = int(tc_span.get("startTimeUnixNano", 0))
-            end_nano = int(tc_span.get("endTimeUnixNano", 0))
+            start_nano = int(start_time or 0)
+            end_nano = int(end_time or 0)
             duration_ms = (end_nano - start_nano) / 1_000_000.0 if end_nano > start_nano else 0
 
             record = {
@@ -205,42 +256,108 @@ def extract_prompt_records(traces: list) -> List[Dict[str, Any]]:
                 "max_tokens": prompt_data.get("max_tokens"),
 
                 # Token usage
-                "prompt_tokens": prompt_data.get("prompt_tokens", 0),
-                "completion_tokens": prompt_data.get("completion_tokens", 0),
-                "total_tokens": prompt_data.get("prompt_tokens", 0) + prompt_data.get("completion_tokens", 0),
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": total_tokens,
 
                 # Tool info
                 "tool_name": tool_name,
                 "tool_args": tool_args,
 
                 # Timing
-                "time": nano_to_iso(tc_span.get("startTimeUnixNano", "")),
+                "time": nano_to_iso(start_time),
                 "duration_ms": duration_ms,
             }
 
-            records.append(record)
+            yield record
+
+def group_trace_spans_range(filepath: str, start: int, end: int) -> Tuple[int, Dict[str, list]]:
+    """Worker entry point: group the spans in one byte range of the file."""
+    export_count = 0
+
+    def counted_exports():
+        nonlocal export_count
+        for export in iter_jsonl_file(filepath, start, end):
+            export_count += 1
+            yield export
+
+    traces_by_id = group_trace_spans(counted_exports())
+    return export_count, traces_by_id
+
+def merge_trace_groups(parts: List[Dict[str, list]]) -> Dict[str, list]:
+    """Combine per-range group_trace_spans() results, in file order."""
+    merged = parts[0]
+    for part in parts[1:]:
+        for trace_id, (tool_call_spans, prompt_attrs) in part.items():
+            group = merged.get(trace_id)
+            if group is None:
+                merged[trace_id] = [tool_call_spans, prompt_attrs]
+            else:
+                group[0].extend(tool_call_spans)
+                if group[1] is None:
+                    group[1] = prompt_attrs
+    # Unpickled keys are fresh strings; intern them again for the records
+    return {sys.intern(trace_id) if isinstance(trace_id, str) else trace_id: group
+            for trace_id, group in merged.items()}
+
+def extract_prompt_records_file(filepath: str, jobs: int = 1) -> Tuple[int, Iterator[Dict[str, Any]]]:
+    """
+    Extract prompt records from a traces.jsonl file, sharding the parse and
+    span grouping across `jobs` processes.
 
-    return records
+    A trace can be split across exports, so workers only group their spans;
+    the groups are merged in file order before any records are built.
+    Files smaller than PARALLEL_MIN_BYTES are read in-process, where
+    start-up would dominate.
+
+    Returns (number of exports, record generator); the records are built
+    lazily, so they can be streamed without holding them all.
+    """
+    if jobs <= 1 or os.path.getsize(filepath) < PARALLEL_MIN_BYTES:
+        export_count, traces_by_id = group_trace_spans_range(filepath, 0, None)
+        return export_count, iter_prompt_records(traces_by_id)
+
+    ranges = split_file(filepath, jobs)
+    # Flush first so forked workers don't inherit (and re-emit) buffered output
+    sys.stdout.flush()
+    with ProcessPoolExecutor(max_workers=len(ranges)) as executor:
+        futures = [executor.submit(group_trace_spans_range, filepath, start, end) for start, end in ranges]
+        parts = [future.result() for future in futures]
+    export_count = sum(count for count, _ in parts)
+    return export_count, iter_prompt_records(merge_trace_groups([groups for _, groups in parts]))
 
 def send_to_mongodb(records, mongo_uri="mongodb://localhost:27017",
                    db_name="opencode_telemetry", collection_name="prompt"):
-    """Send records to MongoDB."""
+    """
+    Send records to MongoDB.
+
+    records may be any iterable (e.g. the iter_prompt_records generator);
+    it is pulled INSERT_BATCH_SIZE records at a time.
+    """
+    # Check for records first, so an empty run needs no pymongo
+    records = iter(records)
+    batches = iter(lambda: list(islice(records, INSERT_BATCH_SIZE)), [])
+    first_batch = next(batches, None)
+    if first_batch is None:
+        print("No records to send to MongoDB.")
+        return 0
+
     try:
         from pymongo import MongoClient
     except ImportError:
         print("Error: pymongo is not installed. Install it with: pip install pymongo")
         sys.exit(1)
 
-    if not records:
-        print("No records to send to MongoDB.")
-        return 0
-
     client = MongoClient(mongo_uri)
     db = client[db_name]
     collection = db[collection_name]
 
-    result = collection.insert_many(records)
-    inserted_count = len(result.inserted_ids)
+    # Insert in fixed-size unordered batches so one bad document doesn't
+    # stop the rest and the driver never builds one huge BSON batch
+    inserted_count = 0
+    for batch in chain([first_batch], batches):
+        result = collection.insert_many(batch, ordered=False)
+        inserted_count += len(result.inserted_ids)
 
     print(f"Successfully inserted {inserted_count} records into MongoDB.")
     print(f"  Database: {db_name}")
@@ -249,50 +366,89 @@ def send_to_mongodb(records, mongo_uri="mongodb://localhost:27017",
     client.close()
     return inserted_count
 
-def print_summary(records: List[Dict[str, Any]]):
-    """Print summary of extracted trace data."""
+def new_summary() -> Dict[str, Any]:
+    """Empty totals for tally_records()."""
+    return {
+        "records": 0,
+        "sessions": set(),
+        "users": set(),
+        "models": Counter(),
+        "tools": Counter(),
+        "languages": Counter(),
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+    }
+
+def tally_records(records: Iterable[Dict[str, Any]], summary: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Pass the records through, adding each one to the summary totals."""
+    sessions, users = summary["sessions"], summary["users"]
+    models, tools, languages = summary["models"], summary["tools"], summary["languages"]
+    # Each optional field is fetched once and tested on the local; the
+    # running totals stay in locals and are stored when the stream ends
+    count = total_prompt = total_completion = 0
+    try:
+        for r in records:
+            count += 1
+            session_id = r.get("session_id")
+            if session_id:
+                sessions.add(session_id)
+            user = r.get("user")
+            if user:
+                users.add(user)
+            models[r["model"]] += 1
+            tools[r["tool_name"]] += 1
+            language = r.get("language")
+            if language:
+                languages[language] += 1
+            total_prompt += r["prompt_tokens"]
+            total_completion += r["completion_tokens"]
+            yield r
+    finally:
+        summary["records"] += count
+        summary["prompt_tokens"] += total_prompt
+        summary["completion_tokens"] += total_completion
+
+def print_summary(summary: Dict[str, Any]):
+    """Print summary of extracted trace data (totals from tally_records())."""
     print("=" * 60)
     print("       OPENCODE TRACE ANALYSIS SUMMARY")
     print("=" * 60)
     print()
 
-    print(f"Total prompt records: {len(records)}")
+    print(f"Total prompt records: {summary['records']}")
     print()
 
-    if not records:
+    if not summary["records"]:
         return
 
+    sessions, users = summary["sessions"], summary["users"]
+    models, tools, languages = summary["models"], summary["tools"], summary["languages"]
+    total_prompt, total_completion = summary["prompt_tokens"], summary["completion_tokens"]
+
     # Session breakdown
-    sessions = set(r.get("session_id") for r in records if r.get("session_id"))
     print(f"Unique sessions: {len(sessions)}")
 
     # User breakdown
-    users = set(r.get("user") for r in records if r.get("user"))
     if users:
         print(f"Users: {', '.join(users)}")
 
     # Model breakdown
-    models = Counter(r["model"] for r in records)
     print("\nModels used:")
     for model, count in models.items():
         print(f"  {model}: {count}")
 
     # Token usage
-    total_prompt = sum(r["prompt_tokens"] for r in records)
-    total_completion = sum(r["completion_tokens"] for r in records)
     print(f"\nTotal tokens:")
     print(f"  Prompt: {total_prompt:,}")
     print(f"  Completion: {total_completion:,}")
     print(f"  Total: {total_prompt + total_completion:,}")
 
     # Tool breakdown
-    tools = Counter(r["tool_name"] for r in records)
     print("\nTool usage:")
     for tool, count in tools.items():
         print(f"  {tool}: {count}")
 
     # Language breakdown
-    languages = Counter(r.get("language") for r in records if r.get("language"))
     if languages:
         print("\nLanguages:")
         for lang, count in languages.items():
@@ -315,28 +471,44 @@ def main():
                        help="Collection name")
     parser.add_argument("--show-records", action="store_true",
                        help="Print records for debugging")
+    parser.add_argument("--jobs", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                       help="Worker processes for parsing large files (default: half the CPUs)")
 
     args = parser.parse_args()
 
     print(f"Analyzing: {args.filepath}\n")
 
     try:
-        traces = parse_traces_file(args.filepath)
-        print(f"Loaded {len(traces)} trace exports\n")
+        export_count, records = extract_prompt_records_file(args.filepath, args.jobs)
+        print(f"Loaded {export_count} trace exports\n")
 
-        records = extract_prompt_records(traces)
-        print(f"Extracted {len(records)} prompt records\n")
+        # The summary is gathered while the records stream past
+        summary = new_summary()
+        records = tally_records(records, summary)
 
-        if args.show_records and records:
-            print("Sample records:")
-            for i, rec in enumerate(records[:3], 1):
-                print(f"\nRecord {i}:")
-                print(json.dumps(rec, indent=2))
-
-        if args.to_mongo and records:
+        if args.to_mongo and not args.show_records:
+            # Records are pulled from the generator batch by batch
             send_to_mongodb(records, args.mongo_uri, args.db_name, args.collection)
-
-        print_summary(records)
+            print(f"Extracted {summary['records']} prompt records\n")
+        else:
+            if args.show_records:
+                # Debug only: keep the records so samples can be printed
+                records = list(records)
+            else:
+                for _ in records:
+                    pass
+            print(f"Extracted {summary['records']} prompt records\n")
+
+            if args.show_records and records:
+                print("Sample records:")
+                for i, rec in enumerate(records[:3], 1):
+                    print(f"\nRecord {i}:")
+                    print(json.dumps(rec, indent=2))
+
+            if args.to_mongo and records:
+                send_to_mongodb(records, args.mongo_uri, args.db_name, args.collection)
+
+        print_summary(summary)
 
     except FileNotFoundError:
         print(f"Error: File not found: {args.filepath}")
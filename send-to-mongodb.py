@@ -9,9 +9,10 @@ Features:
 - Persistent state storage in MongoDB
 - Resume from last position
 - Safe rewind mechanism (4KB) to handle crashes
-- Duplicate prevention via unique IDs + upsert
+- Duplicate prevention via unique IDs (duplicate inserts are rejected)
 - File rotation detection via inode
-- Incremental state saves every 100 records
+- Incremental state saves every few seconds
+- Traces lookups cached on disk, so a grown file only has its new lines scanned
 - Clear logging with progress and summary
 
 Usage:
@@ -26,15 +27,30 @@ import argparse
 import hashlib
 import json
 import logging
+import mmap
 import os
+import marshal
+import queue
 import sys
+import threading
+import time
+from collections import ChainMap, deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
 from datetime import datetime, timezone
-from pathlib import Path
-from typing import Any, Callable, Dict, List, Optional, Tuple
+from functools import lru_cache, partial
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from analyze_metrics import iter_metric_datapoints, split_file
+
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
 
 try:
     from pymongo import MongoClient
-    from pymongo.errors import ConnectionFailure, OperationFailure
+    from pymongo.errors import BulkWriteError, ConnectionFailure, OperationFailure
 except ImportError:
     print("Error: pymongo is required. Install with: pip install pymongo")
     sys.exit(1)
@@ -44,7 +60,12 @@ except ImportError:
 # =============================================================================
 
 REWIND_BYTES = 4096  # 4KB rewind for safety on resume
-STATE_SAVE_INTERVAL = 100  # Save state every 100 records
+STATE_SAVE_SECONDS = 5.0  # Checkpoint state at most every 5 seconds (on full bulk batches)
+BULK_WRITE_SIZE = 1000  # Max records per insert_many (also flushed at every state save)
+DUPLICATE_KEY_ERROR = 11000  # MongoDB write error code for an existing _id
+PARALLEL_MIN_BYTES = 32 * 1024 * 1024  # Files (or new data) below this are never split across processes
+PARSE_CHUNK_BYTES = 8 * 1024 * 1024  # Line-aligned range each import worker parses per task
+WRITE_QUEUE_BATCHES = 2  # Full bulk batches parsing may run ahead of the writer thread
 
 # Default file paths
 DEFAULT_TRACES_FILE = "/home/mtk26468/opencode/otel-data/traces.jsonl"
@@ -60,6 +81,18 @@ METRICS_STATE_COLLECTION = "otel_file_metrics_state"
 PROMPT_COLLECTION = "prompt"
 METRICS_COLLECTION = "metrics"
 
+# Metric names read by extract_enriched_metrics
+METRIC_LOC_ADDED = "opencode.tool.loc.added"
+METRIC_LOC_DELETED = "opencode.tool.loc.deleted"
+METRIC_PERMISSION_REQUESTS = "opencode.permission.requests"
+ENRICHED_METRICS = frozenset((METRIC_LOC_ADDED, METRIC_LOC_DELETED, METRIC_PERMISSION_REQUESTS))
+
+# permission.reply values that count as an accepted edit
+ACCEPT_REPLIES = frozenset(("once", "always", "auto", "accept", "auto_accept"))
+
+# Shared read-only fallback for attributes without a value
+EMPTY = {}
+
 # Logger
 logger = logging.getLogger(__name__)
 
@@ -76,18 +109,56 @@ def get_attribute_value(attributes: List[Dict], key: str, default: Any = None) -
     """
     for attr in attributes:
         if attr.get("key") == key:
-            value = attr.get("value", {})
-            # Handle different value types
-            if "stringValue" in value:
-                return value["stringValue"]
-            elif "intValue" in value:
-                return int(value["intValue"])
-            elif "doubleValue" in value:
-                return float(value["doubleValue"])
-            elif "boolValue" in value:
-                return value["boolValue"]
-            elif "arrayValue" in value:
-                return [get_primitive_value(v) for v in value["arrayValue"].get("values", [])]
+            # The first matching key decides, even if its value is unusable
+            return unwrap_value(attr.get("value", EMPTY), default)
+    return default
+
+
+def unwrap_value(value: Dict, default: Any = None) -> Any:
+    """Unwrap an OTEL attribute value union (default if no known kind is set)."""
+    # Handle different value types; stringValue (the common case) is
+    # tested first, which beats a dict-based dispatch on the kind
+    if "stringValue" in value:
+        return value["stringValue"]
+    elif "intValue" in value:
+        return int(value["intValue"])
+    elif "doubleValue" in value:
+        return float(value["doubleValue"])
+    elif "boolValue" in value:
+        return value["boolValue"]
+    elif "arrayValue" in value:
+        return [get_primitive_value(v) for v in value["arrayValue"].get("values", [])]
+    return default
+
+
+def attributes_by_key(attributes: List[Dict]) -> Dict[str, Dict]:
+    """
+    Map attribute keys to their raw value unions in one pass over the list,
+    for spans/datapoints that read many keys. Values are unwrapped on lookup
+    by resolve(). The first occurrence of a key wins, as in get_attribute_value.
+    """
+    return {attr.get("key"): attr.get("value", EMPTY) for attr in reversed(attributes)}
+
+
+def resolve(attrs: Dict[str, Dict], key: str, default: Any = None) -> Any:
+    """get_attribute_value() for a dict from attributes_by_key(): O(1) per key."""
+    value = attrs.get(key)
+    if value is None:
+        return default
+    return unwrap_value(value, default)
+
+
+def resolve_first(attrs: Dict[str, Dict], keys: Tuple[str, ...], default: Any = None) -> Any:
+    """
+    First truthy value among `keys` in an attributes_by_key() map, else
+    default: the `resolve(a) or resolve(b) or default` chain as one call.
+    """
+    for key in keys:
+        value = attrs.get(key)
+        if value is not None:
+            value = unwrap_value(value)
+            if value:
+                return value
     return default
 
 
@@ -104,58 +175,99 @@ def get_primitive_value(value: Dict) -> Any:
     return None
 
 
+@lru_cache(maxsize=4096)
+def seconds_to_iso(seconds: int) -> str:
+    """
+    Format whole UTC seconds as ISO 8601 (no microseconds, matching
+    analyze_traces.py). Records arrive in bursts that share their second,
+    so most calls are cache hits.
+    """
+    t = time.gmtime(seconds)
+    return f"{t.tm_year:04d}-{t.tm_mon:02d}-{t.tm_mday:02d}T{t.tm_hour:02d}:{t.tm_min:02d}:{t.tm_sec:02d}+00:00"
+
+
+def datapoint_int(dp: Dict) -> int:
+    """Integer value of a sum datapoint, which sets one of asDouble/asInt."""
+    # A present value is used even if it is zero; asDouble (what the plugin
+    # mostly emits) is looked up first
+    value = dp.get("asDouble")
+    if value is None:
+        value = dp.get("asInt")
+    return int(value or 0)
+
+
 def nano_to_iso(nano_timestamp: str) -> Optional[str]:
     """Convert nanosecond timestamp to ISO 8601 format string."""
     try:
-        ts = int(nano_timestamp)
-        dt = datetime.fromtimestamp(ts / 1e9, tz=timezone.utc)
-        # Use strftime to match analyze_traces.py format (no microseconds)
-        return dt.strftime("%Y-%m-%dT%H:%M:%S+00:00")
-    except (ValueError, TypeError, OSError):
+        return seconds_to_iso(int(nano_timestamp) // 1_000_000_000)
+    except (ValueError, TypeError, OverflowError, OSError):
         return None
 
 
+# For metric datapoints: every datapoint of an export shares its
+# timeUnixNano string, so caching on the raw value skips the int parse too.
+# Span timestamps are all distinct and go through nano_to_iso directly.
+cached_nano_to_iso = lru_cache(maxsize=8192)(nano_to_iso)
+
+
+# Keyed by the lower-cased extension without its leading dot
+EXT_LANGUAGE_MAP = {
+    "py": "python",
+    "js": "javascript",
+    "ts": "typescript",
+    "tsx": "typescript",
+    "jsx": "javascript",
+    "java": "java",
+    "go": "go",
+    "rs": "rust",
+    "cpp": "cpp",
+    "c": "c",
+    "h": "c",
+    "hpp": "cpp",
+    "cs": "csharp",
+    "rb": "ruby",
+    "php": "php",
+    "swift": "swift",
+    "kt": "kotlin",
+    "scala": "scala",
+    "sh": "shell",
+    "bash": "shell",
+    "zsh": "shell",
+    "sql": "sql",
+    "html": "html",
+    "css": "css",
+    "scss": "scss",
+    "json": "json",
+    "yaml": "yaml",
+    "yml": "yaml",
+    "xml": "xml",
+    "md": "markdown",
+    "txt": "text",
+}
+
+
+@lru_cache(maxsize=4096)
 def infer_language_from_filepath(filepath: str) -> str:
     """Infer programming language from file extension."""
     if not filepath:
         return "unknown"
 
-    ext_map = {
-        ".py": "python",
-        ".js": "javascript",
-        ".ts": "typescript",
-        ".tsx": "typescript",
-        ".jsx": "javascript",
-        ".java": "java",
-        ".go": "go",
-        ".rs": "rust",
-        ".cpp": "cpp",
-        ".c": "c",
-        ".h": "c",
-        ".hpp": "cpp",
-        ".cs": "csharp",
-        ".rb": "ruby",
-        ".php": "php",
-        ".swift": "swift",
-        ".kt": "kotlin",
-        ".scala": "scala",
-        ".sh": "shell",
-        ".bash": "shell",
-        ".zsh": "shell",
-        ".sql": "sql",
-        ".html": "html",
-        ".css": "css",
-        ".scss": "scss",
-        ".json": "json",
-        ".yaml": "yaml",
-        ".yml": "yaml",
-        ".xml": "xml",
-        ".md": "markdown",
-        ".txt": "text",
-    }
+    # Same result as Path(filepath).suffix: only the basename counts, and a
+    # leading dot marks a hidden file rather than an extension
+    stem, dot, ext = filepath.rpartition("/")[2].rpartition(".")
+    if not stem:
+        return "unknown"
+    return EXT_LANGUAGE_MAP.get(ext.lower(), "unknown")
 
-    ext = Path(filepath).suffix.lower()
-    return ext_map.get(ext, "unknown")
+
+def map_file(f):
+    """
+    Map an open file read-only. An empty file can't be mapped, so it gets
+    empty bytes instead, which read the same way.
+    """
+    if os.fstat(f.fileno()).st_size == 0:
+        return nullcontext(b"")
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
 
 
 # =============================================================================
@@ -188,11 +300,20 @@ def load_state(db, state_collection_name: str) -> Dict:
 def save_state(db, state_collection_name: str, file_path: str, offset: int,
                line_number: int, inode: int, mtime: float,
                records_inserted: int, last_total_lines: Optional[int] = None) -> None:
-    """Save processing state to MongoDB."""
+    """
+    Save processing state to MongoDB.
+
+    Every save is acknowledged, so saves reach the server in the order they
+    are made and a periodic checkpoint can never land after the final save
+    and move the stored offset back. Checkpoints are made by the import's
+    writer thread, so waiting for them does not hold up parsing.
+
+    The fields are written with $set, so a checkpoint (which has no
+    last_total_lines) keeps the one from the last full save.
+    """
     collection = db[state_collection_name]
 
     state = {
-        "_id": "state",
         "file_path": file_path,
         "offset": offset,
         "line_number": line_number,
@@ -205,10 +326,38 @@ def save_state(db, state_collection_name: str, file_path: str, offset: int,
     if last_total_lines is not None:
         state["last_total_lines"] = last_total_lines
 
-    collection.replace_one({"_id": "state"}, state, upsert=True)
+    # Plain $set rather than $max on the offset: after a rotation the
+    # offset legitimately goes back down
+    collection.update_one({"_id": "state"}, {"$set": state}, upsert=True)
     logger.debug(f"Saved state: offset={offset}, line={line_number}")
 
 
+def bulk_insert(collection, records: List[Dict]) -> int:
+    """
+    Insert queued records in one unordered insert_many.
+
+    Records whose _id already exists are rejected by the _id index with a
+    duplicate key error and left untouched, like a $setOnInsert upsert but
+    without the lookup before each insert.
+
+    Returns the number of new documents; the rest already existed.
+    """
+    if not records:
+        return 0
+    try:
+        inserted = len(collection.insert_many(records, ordered=False).inserted_ids)
+    except BulkWriteError as e:
+        # Unordered: every other record in the batch was still inserted
+        details = e.details
+        failed = sum(1 for error in details.get("writeErrors", [])
+                     if error.get("code") != DUPLICATE_KEY_ERROR)
+        if failed:
+            logger.error(f"  Bulk insert: {failed} of {len(records)} records failed")
+        inserted = details.get("nInserted", 0)
+    logger.debug(f"  Bulk insert: {inserted} new, {len(records) - inserted} duplicates")
+    return inserted
+
+
 def detect_rotation(state: Dict, current_inode: int, current_size: int) -> bool:
     """
     Detect if the file has been rotated or truncated.
@@ -282,8 +431,8 @@ def show_status(db, traces_file: str, metrics_file: str) -> None:
     # Show collection counts
     print(f"\n\nMongoDB Collections:")
     print("-" * 40)
-    print(f"  {PROMPT_COLLECTION}: {db[PROMPT_COLLECTION].count_documents({}):,} documents")
-    print(f"  {METRICS_COLLECTION}: {db[METRICS_COLLECTION].count_documents({}):,} documents")
+    print(f"  {PROMPT_COLLECTION}: {db[PROMPT_COLLECTION].estimated_document_count():,} documents")
+    print(f"  {METRICS_COLLECTION}: {db[METRICS_COLLECTION].estimated_document_count():,} documents")
     print("=" * 80)
 
 
@@ -302,6 +451,9 @@ def generate_unique_id(inode: int, byte_position: int, line_bytes: bytes) -> str
     - Different content at same position = different ID (handles edits)
     - Same content at different position = different ID (handles duplicates)
     """
+    # The hash is part of every stored _id, so switching algorithms would
+    # re-insert the rewound region as new documents. SHA-1 also runs on
+    # OpenSSL's accelerated path, ahead of blake2b/md5 for log-sized lines.
     line_hash = hashlib.sha1(line_bytes).hexdigest()[:12]
     return f"{inode}:{byte_position}:{line_hash}"
 
@@ -310,11 +462,41 @@ def generate_unique_id(inode: int, byte_position: int, line_bytes: bytes) -> str
 # Trace Extraction Functions
 # =============================================================================
 
-def extract_traces_lookup(trace_data: Dict) -> Dict[str, Dict]:
+class TraceInfo(NamedTuple):
+    """Per-call trace data read by extract_enriched_metrics."""
+    model: Any
+    input_tokens: Any
+    output_tokens: Any
+
+
+# Stand-in for calls missing from the traces lookup
+NO_TRACE_INFO = TraceInfo(None, 0, 0)
+
+
+def add_trace_info(lookup: Dict[str, TraceInfo], span: Dict, attrs: Dict[str, Dict]) -> None:
+    """Add a span's TraceInfo (model and tokens) to `lookup` under its call_id."""
+    # Get call_id
+    call_id = resolve(attrs, "gen_ai.openai.request.service_tier")
+    if not call_id:
+        call_id = resolve(attrs, "call_id")
+    if not call_id:
+        call_id = span.get("spanId")
+
+    if call_id:
+        # Only the fields metrics enrichment reads are kept; this
+        # runs for every span of the file
+        lookup[call_id] = TraceInfo(
+            resolve(attrs, "gen_ai.request.model", "unknown"),
+            resolve(attrs, "gen_ai.usage.input_tokens", 0),
+            resolve(attrs, "gen_ai.usage.output_tokens", 0),
+        )
+
+
+def extract_traces_lookup(trace_data: Dict) -> Dict[str, TraceInfo]:
     """
     Build a lookup table from trace data.
 
-    Returns dict mapping call_id to trace info (model, tokens, etc.)
+    Returns dict mapping call_id to TraceInfo (model and tokens)
     """
     lookup = {}
 
@@ -327,148 +509,420 @@ def extract_traces_lookup(trace_data: Dict) -> Dict[str, Dict]:
             spans = scope_span.get("spans", [])
 
             for span in spans:
-                attributes = span.get("attributes", [])
-
-                # Get call_id
-                call_id = get_attribute_value(attributes, "gen_ai.openai.request.service_tier")
-                if not call_id:
-                    call_id = get_attribute_value(attributes, "call_id")
-                if not call_id:
-                    call_id = span.get("spanId")
-
-                if call_id:
-                    lookup[call_id] = {
-                        "model": get_attribute_value(attributes, "gen_ai.request.model", "unknown"),
-                        "input_tokens": get_attribute_value(attributes, "gen_ai.usage.input_tokens", 0),
-                        "output_tokens": get_attribute_value(attributes, "gen_ai.usage.output_tokens", 0),
-                        "total_tokens": (
-                            get_attribute_value(attributes, "gen_ai.usage.input_tokens", 0) +
-                            get_attribute_value(attributes, "gen_ai.usage.output_tokens", 0)
-                        ),
-                        "session_id": get_attribute_value(attributes, "session.id"),
-                        "span_id": span.get("spanId"),
-                        "trace_id": span.get("traceId"),
-                        "start_time": nano_to_iso(span.get("startTimeUnixNano", "0")),
-                        "end_time": nano_to_iso(span.get("endTimeUnixNano", "0")),
-                    }
+                add_trace_info(lookup, span, attributes_by_key(span.get("attributes", [])))
 
     return lookup
 
 
-def has_attribute(span: Dict, attr_key: str) -> bool:
-    """Check if span has a specific attribute key."""
-    for attr in span.get("attributes", []):
-        if attr.get("key") == attr_key:
-            return True
-    return False
-
-
-def is_tool_call_span(span: Dict) -> bool:
-    """Robust detection of tool call spans using attributes, not span name."""
-    # Method 1: Check operation.name
-    operation_name = get_attribute_value(span.get("attributes", []), "operation.name")
-    if operation_name and "toolCall" in str(operation_name):
-        return True
-
-    # Method 2: Check ai.operationId
-    operation_id = get_attribute_value(span.get("attributes", []), "ai.operationId")
-    if operation_id and "toolCall" in str(operation_id):
-        return True
+# Attribute fallback chains, in order of preference
+PROMPT_MESSAGES_KEYS = ("ai.prompt.messages", "ai.prompt")
+PROMPT_TOKENS_KEYS = ("ai.usage.inputTokens", "gen_ai.usage.input_tokens")
+COMPLETION_TOKENS_KEYS = ("ai.usage.outputTokens", "gen_ai.usage.output_tokens")
+TOOL_CALL_ID_KEYS = ("ai.toolCall.id", "call.id")
+TOOL_NAME_KEYS = ("ai.toolCall.name", "tool.name")
 
-    # Method 3: Check for ai.toolCall.id attribute (definitive)
-    return has_attribute(span, "ai.toolCall.id")
+# Fields of extract_prompt_data_from_span() output, in output order
+PROMPT_DATA_FIELDS = (
+    "prompt_messages", "prompt_messages_raw", "response_text", "prompt_tokens",
+    "completion_tokens", "model", "provider", "temperature", "max_tokens",
+)
 
 
-def is_prompt_span(span: Dict) -> bool:
-    """Robust detection of spans containing prompts using attribute presence."""
-    return has_attribute(span, "ai.prompt.messages") or has_attribute(span, "ai.prompt")
-
+def classify_span(attrs: Dict[str, Dict]) -> Tuple[bool, bool]:
+    """
+    Classify a span from its attributes_by_key() map, using attributes
+    rather than span names.
 
-def extract_prompt_data_from_span(span: Dict) -> Dict:
+    Returns (is_tool_call, is_prompt).
+    """
+    # Tool call: the definitive ai.toolCall.id attribute is present (checked
+    # first, as a plain key test), or operation.name / ai.operationId
+    # mention toolCall
+    is_tool_call = "ai.toolCall.id" in attrs
+    if not is_tool_call:
+        for key in ("operation.name", "ai.operationId"):
+            value = resolve(attrs, key)
+            # Strings are tested as they are; other values (e.g. arrayValue
+            # lists) are matched on their str() form, as before
+            if value and "toolCall" in (value if isinstance(value, str) else str(value)):
+                is_tool_call = True
+                break
+
+    # Prompt: carries the prompt attributes
+    is_prompt = "ai.prompt.messages" in attrs or "ai.prompt" in attrs
+    return is_tool_call, is_prompt
+
+
+def extract_prompt_data_from_span(span: Dict, parse_messages: bool = True,
+                                  attrs: Optional[Dict[str, Dict]] = None) -> Dict:
     """
     Extract prompt data from a prompt span.
 
     Returns a dict with: prompt_messages, response_text, prompt_tokens,
     completion_tokens, model, provider, temperature, max_tokens
+
+    With parse_messages=False the prompt messages are left out, which skips
+    decoding the (often large) conversation history JSON. attrs is the
+    span's attributes_by_key() map, if the caller already built it.
     """
     prompt_data = {}
-    attrs = span.get("attributes", [])
+    if attrs is None:
+        attrs = attributes_by_key(span.get("attributes", []))
 
     # Extract prompt messages
-    prompt_json = get_attribute_value(attrs, "ai.prompt.messages") or \
-                 get_attribute_value(attrs, "ai.prompt")
+    prompt_json = parse_messages and resolve_first(attrs, PROMPT_MESSAGES_KEYS)
 
     if prompt_json:
         try:
             if isinstance(prompt_json, str):
-                prompt_data["prompt_messages"] = json.loads(prompt_json)
+                prompt_data["prompt_messages"] = json_loads(prompt_json)
             else:
                 prompt_data["prompt_messages"] = prompt_json
         except:
             prompt_data["prompt_messages_raw"] = str(prompt_json)
 
     # Extract other fields
-    prompt_data["response_text"] = get_attribute_value(attrs, "ai.response.text")
-    prompt_data["prompt_tokens"] = get_attribute_value(attrs, "ai.usage.inputTokens") or \
-                                   get_attribute_value(attrs, "gen_ai.usage.input_tokens") or 0
-    prompt_data["completion_tokens"] = get_attribute_value(attrs, "ai.usage.outputTokens") or \
-                                       get_attribute_value(attrs, "gen_ai.usage.output_tokens") or 0
-    prompt_data["model"] = get_attribute_value(attrs, "gen_ai.request.model") or "unknown"
-    prompt_data["provider"] = get_attribute_value(attrs, "gen_ai.system") or "unknown"
-    prompt_data["temperature"] = get_attribute_value(attrs, "gen_ai.request.temperature")
-    prompt_data["max_tokens"] = get_attribute_value(attrs, "gen_ai.request.max_tokens")
+    prompt_data["response_text"] = resolve(attrs, "ai.response.text")
+    prompt_data["prompt_tokens"] = resolve_first(attrs, PROMPT_TOKENS_KEYS, 0)
+    prompt_data["completion_tokens"] = resolve_first(attrs, COMPLETION_TOKENS_KEYS, 0)
+    prompt_data["model"] = resolve(attrs, "gen_ai.request.model") or "unknown"
+    prompt_data["provider"] = resolve(attrs, "gen_ai.system") or "unknown"
+    prompt_data["temperature"] = resolve(attrs, "gen_ai.request.temperature")
+    prompt_data["max_tokens"] = resolve(attrs, "gen_ai.request.max_tokens")
 
     return prompt_data
 
 
-def build_prompt_data_lookup(traces_file: str) -> Dict[str, Dict]:
+def unfilled_prompt_fields(prompt_data: Dict) -> List[str]:
     """
-    Build a lookup table mapping traceId to prompt span data.
-
-    This enables correlation of prompt data with tool call spans
-    even when they appear in different JSONL lines (OTEL batching).
+    Fields of a prompt lookup entry that a later prompt span of the same
+    trace may still fill: those that are empty, zero or "unknown".
+    """
+    fields = []
+    for key in PROMPT_DATA_FIELDS:
+        value = prompt_data.get(key)
+        if not value or value == "unknown":
+            fields.append(key)
+    # The raw fallback only matters while the messages themselves are missing
+    if "prompt_messages" not in fields and "prompt_messages_raw" in fields:
+        fields.remove("prompt_messages_raw")
+    return fields
+
+
+def add_prompt_span(lookup: Dict[str, Dict], unfilled: Dict[str, List[str]],
+                    trace_id: str, span: Dict, attrs: Dict[str, Dict]) -> None:
+    """
+    Record a prompt span in the prompt data lookup.
 
-    Returns: Dict[traceId, prompt_data]
+    The FIRST prompt span per traceId makes the entry; later ones only fill
+    its fields that are still empty, zero or "unknown". `unfilled` tracks
+    those fields per traceId.
     """
-    lookup = {}  # traceId -> prompt_data
+    entry = lookup.get(trace_id)
+    if entry is None:
+        entry = lookup[trace_id] = extract_prompt_data_from_span(span, attrs=attrs)
+        unfilled[trace_id] = unfilled_prompt_fields(entry)
+        return
+
+    # Once every field is filled, later spans can't change the entry
+    fields = unfilled[trace_id]
+    if not fields:
+        return
+
+    # Later prompt spans repeat the conversation so far;
+    # only decode it if the first span had none
+    prompt_data = extract_prompt_data_from_span(
+        span, parse_messages="prompt_messages" in fields, attrs=attrs)
+    # Fill empty/zero/"unknown" fields with non-empty new values
+    for key in fields:
+        value = prompt_data.get(key)
+        if value:
+            entry[key] = value
+    unfilled[trace_id] = unfilled_prompt_fields(entry)
 
-    if not os.path.exists(traces_file):
-        return lookup
 
-    with open(traces_file, 'r') as f:
+def scan_traces_range(traces_file: str, start: int = 0,
+                      end: Optional[int] = None) -> Tuple[Dict, Dict, Dict]:
+    """
+    Decode the traces lines beginning in [start, end) once and build, from
+    each span's attribute map:
+    - traces_lookup: call_id -> TraceInfo (see extract_traces_lookup)
+    - prompt_data_lookup: traceId -> prompt data (see add_prompt_span)
+    - tool_calls: call_id -> (trace_id, language, file_path, fallback prompt
+      data), the inputs of build_prompt_lookup
+
+    start must be a line boundary (see split_file). Runs in a worker
+    process when the file is sharded.
+    """
+    traces_lookup = {}
+    prompt_data_lookup = {}
+    unfilled = {}  # traceId -> fields of its entry a later span may still fill
+    tool_calls = {}
+
+    # Binary mode with a large buffer: the JSON decoder takes the raw bytes
+    # (skipping the newline itself), so lines are never decoded or stripped
+    with open(traces_file, 'rb', buffering=1 << 20) as f:
+        # Ask for a larger readahead window on this range (not on macOS)
+        try:
+            os.posix_fadvise(f.fileno(), start, 0 if end is None else end - start,
+                             os.POSIX_FADV_SEQUENTIAL)
+        except (AttributeError, OSError):
+            pass
+        f.seek(start)
+        pos = start
         for line in f:
+            if end is not None and pos >= end:
+                break
+            pos += len(line)
+            # Only resourceSpans exports hold spans; anything else (blank
+            # lines included) is skipped without decoding. The key leads
+            # an export, so the scan stops within its first bytes
+            if b'"resourceSpans"' not in line:
+                continue
             try:
-                data = json.loads(line.strip())
+                data = json_loads(line)
+                line_calls = []
+                # Prompt spans without a traceId never reach the lookup; like
+                # extract_prompt_records, their line's first one stands in
+                fallback_spans = {}
                 for rs in data.get("resourceSpans", []):
                     for ss in rs.get("scopeSpans", []):
                         for span in ss.get("spans", []):
-                            # Only process prompt spans
-                            if not is_prompt_span(span):
-                                continue
+                            attrs = attributes_by_key(span.get("attributes", []))
+                            add_trace_info(traces_lookup, span, attrs)
 
+                            is_tool_call, is_prompt = classify_span(attrs)
                             trace_id = span.get("traceId")
-                            if not trace_id:
-                                continue
-
-                            # Extract prompt data from this span
-                            prompt_data = extract_prompt_data_from_span(span)
-
-                            # Store in lookup (merge if exists, prefer non-empty values)
-                            if trace_id not in lookup:
-                                lookup[trace_id] = prompt_data
-                            else:
-                                # Merge with existing - prefer non-empty/non-zero values
-                                for key, value in prompt_data.items():
-                                    existing = lookup[trace_id].get(key)
-                                    # Replace if current is empty/zero and new has value
-                                    if value and (not existing or existing == "unknown" or existing == 0):
-                                        lookup[trace_id][key] = value
+                            if is_prompt:
+                                if trace_id:
+                                    add_prompt_span(prompt_data_lookup, unfilled, trace_id, span, attrs)
+                                elif trace_id not in fallback_spans:
+                                    fallback_spans[trace_id] = (span, attrs)
+                            if is_tool_call:
+                                line_calls.append((span, attrs, trace_id))
+
+                for span, attrs, trace_id in line_calls:
+                    call_id = resolve_first(attrs, TOOL_CALL_ID_KEYS) or span.get("spanId", "unknown")
+                    fallback = None
+                    if not trace_id and trace_id in fallback_spans:
+                        prompt_span, prompt_attrs = fallback_spans[trace_id]
+                        fallback = extract_prompt_data_from_span(prompt_span, attrs=prompt_attrs)
+                    tool_calls[call_id] = (trace_id, resolve(attrs, "language"),
+                                           resolve(attrs, "file.path"), fallback)
             except (json.JSONDecodeError, Exception):
                 continue
 
+    return traces_lookup, prompt_data_lookup, tool_calls
+
+
+def merge_prompt_lookups(parts: List[Dict[str, Dict]]) -> Dict[str, Dict]:
+    """
+    Merge per-range prompt lookups, given in file order.
+
+    A trace seen in several ranges keeps its earliest entry; later ranges
+    only fill the fields that are still unfilled, as a single pass would.
+    """
+    lookup = parts[0]
+    for part in parts[1:]:
+        for trace_id, prompt_data in part.items():
+            entry = lookup.get(trace_id)
+            if entry is None:
+                lookup[trace_id] = prompt_data
+                continue
+            for key in unfilled_prompt_fields(entry):
+                value = prompt_data.get(key)
+                if value:
+                    entry[key] = value
     return lookup
 
 
+def scan_traces_file(traces_file: str, jobs: int = 1) -> Tuple[Dict, Dict, Dict]:
+    """
+    Build the traces lookup, the prompt data lookup and the tool calls of
+    the whole traces file in a single pass (see scan_traces_range).
+
+    The prompt data lookup maps traceId to prompt span data. It enables
+    correlation of prompt data with tool call spans even when they appear
+    in different JSONL lines (OTEL batching).
+
+    With jobs > 1, files of at least PARALLEL_MIN_BYTES are split into
+    line-aligned ranges decoded by a process pool and merged in file order.
+    """
+    try:
+        size = os.path.getsize(traces_file)
+    except FileNotFoundError:
+        return {}, {}, {}
+
+    if jobs <= 1 or size < PARALLEL_MIN_BYTES:
+        return scan_traces_range(traces_file)
+
+    ranges = split_file(traces_file, jobs)
+    # Flush first so forked workers don't inherit (and re-emit) buffered output
+    sys.stdout.flush()
+    with ProcessPoolExecutor(max_workers=len(ranges)) as executor:
+        futures = [executor.submit(scan_traces_range, traces_file, start, end)
+                   for start, end in ranges]
+        parts = [future.result() for future in futures]
+
+    traces_lookup, _, tool_calls = parts[0]
+    for part_traces, _, part_calls in parts[1:]:
+        traces_lookup.update(part_traces)
+        tool_calls.update(part_calls)
+    return traces_lookup, merge_prompt_lookups([part[1] for part in parts]), tool_calls
+
+
+def build_prompt_lookup(tool_calls: Dict, prompt_data_lookup: Dict[str, Dict]) -> Dict[str, Dict]:
+    """
+    Build {call_id: {model, language, ...}} for metrics enrichment from the
+    tool calls of scan_traces_file, with the same prompt data as the call's
+    prompt record.
+    """
+    prompt_lookup = {}
+    for call_id, (trace_id, language, file_path, fallback) in tool_calls.items():
+        prompt_data = prompt_data_lookup.get(trace_id) or fallback or EMPTY
+        prompt_lookup[call_id] = {
+            "model": prompt_data.get("model", "unknown"),
+            "language": language,
+            "file_path": file_path,
+            "prompt_tokens": prompt_data.get("prompt_tokens", 0),
+            "completion_tokens": prompt_data.get("completion_tokens", 0),
+        }
+    return prompt_lookup
+
+
+# =============================================================================
+# Lookup Cache
+# =============================================================================
+
+LOOKUP_CACHE_VERSION = 2  # Bump whenever the cached lookup layout changes
+
+
+def lookup_cache_path(traces_file: str) -> str:
+    """Cache file for the lookups of a traces file, under $XDG_CACHE_HOME."""
+    cache_dir = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    key = hashlib.sha1(os.path.abspath(traces_file).encode()).hexdigest()[:16]
+    return os.path.join(cache_dir, "opencode-telemetry", f"lookups-{key}.marshal")
+
+
+def last_line_end(f, size: int) -> int:
+    """Offset just past the last newline among the first `size` bytes of f."""
+    pos = size
+    while pos > 0:
+        block_start = max(0, pos - (1 << 16))
+        f.seek(block_start)
+        newline = f.read(pos - block_start).rfind(b"\n")
+        if newline != -1:
+            return block_start + newline + 1
+        pos = block_start
+    return 0
+
+
+def edge_digest(f, offset: int) -> str:
+    """
+    SHA-1 of the first REWIND_BYTES of the file and the REWIND_BYTES before
+    offset, to tell an append from a rewrite.
+    """
+    digest = hashlib.sha1()
+    f.seek(0)
+    digest.update(f.read(min(REWIND_BYTES, offset)))
+    start = max(0, offset - REWIND_BYTES)
+    f.seek(start)
+    digest.update(f.read(offset - start))
+    return digest.hexdigest()
+
+
+def scan_traces_cached(traces_file: str, jobs: int = 1, use_cache: bool = True,
+                       rescan: bool = False) -> Tuple[Dict, Dict, Dict]:
+    """
+    scan_traces_file() backed by an on-disk cache of its result.
+
+    The cache records how far the file was scanned (up to its last complete
+    line). If the file has only grown since, just the new lines are scanned
+    and merged in, as a sharded scan would; an unchanged file is not read at
+    all. A different inode, a shorter file, a changed mtime at the same
+    size, or changed bytes at the start of the file or before the scanned
+    offset mean a full scan. A rewrite in place that keeps all of those is
+    not detected; --no-lookup-cache or --reset-state rescans.
+
+    The cache is written with marshal, which only holds plain data and
+    can't run code when loaded (unlike pickle). It is still read as the
+    user's own file; an unreadable or mismatched one is just rebuilt.
+
+    rescan=True ignores the cache but still rewrites it; use_cache=False
+    neither reads nor writes it.
+    """
+    if not os.path.exists(traces_file):
+        return {}, {}, {}
+
+    cache_path = lookup_cache_path(traces_file)
+    with open(traces_file, 'rb') as f:
+        stat = os.fstat(f.fileno())
+        end = last_line_end(f, stat.st_size)
+
+        cached = None
+        if use_cache and not rescan:
+            try:
+                with open(cache_path, 'rb') as cache:
+                    cached = marshal.load(cache)
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.debug(f"  Ignoring unreadable lookup cache {cache_path}: {e}")
+
+        reused = (isinstance(cached, dict) and cached.get("version") == LOOKUP_CACHE_VERSION
+                  and cached["inode"] == stat.st_ino and cached["offset"] <= end
+                  and cached["size"] <= stat.st_size
+                  and (cached["size"] < stat.st_size or cached["mtime"] == stat.st_mtime)
+                  and cached["digest"] == edge_digest(f, cached["offset"]))
+        if cached is not None and not reused:
+            logger.info("  Lookup cache out of date; scanning the whole file")
+        if reused:
+            # marshal keeps plain tuples; TraceInfo is restored here
+            traces_lookup = {call_id: TraceInfo(*info) for call_id, info in cached["traces_lookup"].items()}
+            prompt_data_lookup = cached["prompt_data_lookup"]
+            tool_calls = cached["tool_calls"]
+            offset = cached["offset"]
+            if offset < end:
+                part_traces, part_prompts, part_calls = scan_traces_range(traces_file, offset, end)
+                traces_lookup.update(part_traces)
+                prompt_data_lookup = merge_prompt_lookups([prompt_data_lookup, part_prompts])
+                tool_calls.update(part_calls)
+            logger.info(f"  Lookup cache reused; scanned {end - offset:,} new bytes")
+        else:
+            # Lines past `end` (a partial last line, or lines appended during
+            # the scan) are rescanned next time; scanning a line twice in
+            # file order leaves the lookups unchanged
+            traces_lookup, prompt_data_lookup, tool_calls = scan_traces_file(traces_file, jobs)
+
+        # Nothing to write if caching is off or the cache is already current
+        if not use_cache or (reused and offset == end):
+            return traces_lookup, prompt_data_lookup, tool_calls
+
+        cached = {
+            "version": LOOKUP_CACHE_VERSION,
+            "inode": stat.st_ino,
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "offset": end,
+            "digest": edge_digest(f, end),
+            "traces_lookup": {call_id: tuple(info) for call_id, info in traces_lookup.items()},
+            "prompt_data_lookup": prompt_data_lookup,
+            "tool_calls": tool_calls,
+        }
+
+    # Write to a temporary file first so an interrupted run never leaves a
+    # truncated cache behind
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(cache_path + ".tmp", 'wb') as cache:
+            marshal.dump(cached, cache)
+        os.replace(cache_path + ".tmp", cache_path)
+    except (OSError, ValueError) as e:
+        logger.warning(f"  Could not write lookup cache {cache_path}: {e}")
+
+    return traces_lookup, prompt_data_lookup, tool_calls
+
+
 def extract_prompt_records(trace_data: Dict, global_prompt_lookup: Optional[Dict] = None) -> List[Dict]:
     """
     Extract prompt records from trace data for the prompt collection.
@@ -496,10 +950,14 @@ def extract_prompt_records(trace_data: Dict, global_prompt_lookup: Optional[Dict
     }
     """
     records = []
-    global_prompt_lookup = global_prompt_lookup or {}
+    global_prompt_lookup = global_prompt_lookup or EMPTY
+    # One import timestamp for every record of this line
+    imported_at = datetime.now(timezone.utc).isoformat()
 
-    # First pass: organize spans by traceId
-    traces_by_id = {}
+    # First pass: organize spans by traceId, classifying each span as it is
+    # seen using robust detection. Only tool call spans (with their attribute
+    # map) and prompt spans are kept; other spans are never stored.
+    traces_by_id = {}  # trace_id -> ([(span, attrs)] tool calls, [span] prompts)
 
     resource_spans = trace_data.get("resourceSpans", [])
     for resource_span in resource_spans:
@@ -508,65 +966,72 @@ def extract_prompt_records(trace_data: Dict, global_prompt_lookup: Optional[Dict
             spans = scope_span.get("spans", [])
             for span in spans:
                 trace_id = span.get("traceId")
-                if trace_id not in traces_by_id:
-                    traces_by_id[trace_id] = []
-                traces_by_id[trace_id].append(span)
+                group = traces_by_id.get(trace_id)
+                if group is None:
+                    group = traces_by_id[trace_id] = ([], [])
 
-    # Second pass: correlate spans within each trace
-    for trace_id, spans in traces_by_id.items():
-        # Find tool call spans using robust detection
-        tool_call_spans = [s for s in spans if is_tool_call_span(s)]
+                attrs = attributes_by_key(span.get("attributes", []))
+                is_tool_call, is_prompt = classify_span(attrs)
+                if is_tool_call:
+                    group[0].append((span, attrs))
+                if is_prompt:
+                    group[1].append(span)
 
+    # Second pass: correlate spans within each trace
+    for trace_id, (tool_call_spans, prompt_spans) in traces_by_id.items():
         if not tool_call_spans:
             continue
 
         # ALWAYS use the global prompt lookup if available
         # This ensures we use the FIRST prompt span per traceId (matching analyze_traces.py)
         # which is critical because OTEL may have multiple prompt spans with different data
-        prompt_data = {}
-        if trace_id in global_prompt_lookup:
-            prompt_data = global_prompt_lookup[trace_id].copy()
-        else:
+        # Only read below, so the shared entry (or EMPTY) is used without a copy
+        prompt_data = global_prompt_lookup.get(trace_id)
+        if prompt_data is None:
+            prompt_data = EMPTY
             # Fall back to local prompt spans only if not in global lookup
             # (shouldn't happen if global lookup is built correctly)
-            prompt_spans = [s for s in spans if is_prompt_span(s)]
             if prompt_spans:
                 prompt_data = extract_prompt_data_from_span(prompt_spans[0])
                 logger.debug(f"Fallback to local prompt span for trace {trace_id[:12]}...")
 
+        # Extract user prompt from messages (shared by every toolCall in the trace)
+        user_prompt = ""
+        if "prompt_messages" in prompt_data:
+            for msg in prompt_data["prompt_messages"]:
+                if msg.get("role") == "user":
+                    content = msg.get("content")
+                    if isinstance(content, str):
+                        user_prompt = content
+                    elif isinstance(content, list):
+                        user_prompt = " ".join([c.get("text", "") for c in content if c.get("type") == "text"])
+                    break
+
+        # Token totals are per trace, so add them up once rather than per record
+        prompt_tokens = prompt_data.get("prompt_tokens", 0)
+        completion_tokens = prompt_data.get("completion_tokens", 0)
+        total_tokens = prompt_tokens + completion_tokens
+
         # Create record for each toolCall
-        for tc_span in tool_call_spans:
-            # Extract user prompt from messages
-            user_prompt = ""
-            if "prompt_messages" in prompt_data:
-                for msg in prompt_data["prompt_messages"]:
-                    if msg.get("role") == "user":
-                        content = msg.get("content")
-                        if isinstance(content, str):
-                            user_prompt = content
-                        elif isinstance(content, list):
-                            user_prompt = " ".join([c.get("text", "") for c in content if c.get("type") == "text"])
-                        break
+        for tc_span, attrs in tool_call_spans:
 
             # Extract call_id
-            call_id = get_attribute_value(tc_span.get("attributes", []), "ai.toolCall.id") or \
-                     get_attribute_value(tc_span.get("attributes", []), "call.id") or \
-                     tc_span.get("spanId", "unknown")
+            call_id = resolve_first(attrs, TOOL_CALL_ID_KEYS) or tc_span.get("spanId", "unknown")
 
             # Extract tool info
-            tool_name = get_attribute_value(tc_span.get("attributes", []), "ai.toolCall.name") or \
-                       get_attribute_value(tc_span.get("attributes", []), "tool.name") or "unknown"
-            tool_args = get_attribute_value(tc_span.get("attributes", []), "ai.toolCall.args") or "{}"
+            tool_name = resolve_first(attrs, TOOL_NAME_KEYS, "unknown")
+            tool_args = resolve(attrs, "ai.toolCall.args") or "{}"
 
             # Extract session context (if injected by plugin)
-            session_id = get_attribute_value(tc_span.get("attributes", []), "session.id")
-            user = get_attribute_value(tc_span.get("attributes", []), "user")
-            file_path = get_attribute_value(tc_span.get("attributes", []), "file.path")
-            language = get_attribute_value(tc_span.get("attributes", []), "language")
+            session_id = resolve(attrs, "session.id")
+            user = resolve(attrs, "user")
+            file_path = resolve(attrs, "file.path")
+            language = resolve(attrs, "language")
 
             # Calculate duration
-            start_nano = int(tc_span.get("startTimeUnixNano", 0))
-            end_nano = int(tc_span.get("endTimeUnixNano", 0))
+            start_time = tc_span.get("startTimeUnixNano")
+            start_nano = int(start_time or 0)
+            end_nano = int(tc_span.get("endTimeUnixNano") or 0)
             duration_ms = (end_nano - start_nano) / 1_000_000.0 if end_nano > start_nano else 0
 
             # Build record matching analyze_traces.py schema
@@ -593,20 +1058,20 @@ def extract_prompt_records(trace_data: Dict, global_prompt_lookup: Optional[Dict
                 "max_tokens": prompt_data.get("max_tokens"),
 
                 # Token usage
-                "prompt_tokens": prompt_data.get("prompt_tokens", 0),
-                "completion_tokens": prompt_data.get("completion_tokens", 0),
-                "total_tokens": prompt_data.get("prompt_tokens", 0) + prompt_data.get("completion_tokens", 0),
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": total_tokens,
 
                 # Tool info
                 "tool_name": tool_name,
                 "tool_args": tool_args,
 
                 # Timing
-                "time": nano_to_iso(tc_span.get("startTimeUnixNano", "")),
+                "time": nano_to_iso(start_time),
                 "duration_ms": duration_ms,
 
                 # Import metadata
-                "imported_at": datetime.now(timezone.utc).isoformat()
+                "imported_at": imported_at
             }
 
             records.append(record)
@@ -661,156 +1126,266 @@ def extract_enriched_metrics(metrics_data: Dict, traces_lookup: Dict, prompt_loo
         reply_type: string
     }
     """
-    prompt_lookup = prompt_lookup or {}
+    prompt_lookup = prompt_lookup or EMPTY
     records = []
+    # One import timestamp for every record of this line
+    imported_at = datetime.now(timezone.utc).isoformat()
 
-    # First pass: collect LOC data by call_id
+    # Walk the export once: LOC datapoints are collected by call_id as they
+    # come, permission datapoints are kept (in order) for the second pass,
+    # since they need the LOC data of the whole export
     loc_data = {}  # call_id -> {added, deleted, language, filepath, ...}
+    permission_points = []
+
+    for metric_name, data_points in iter_metric_datapoints(metrics_data, ENRICHED_METRICS):
+        # Collect LOC added data
+        if metric_name == METRIC_LOC_ADDED:
+            for dp in data_points:
+                attrs = attributes_by_key(dp.get("attributes", []))
+                call_id = resolve(attrs, "call.id")
+                if call_id:
+                    # Look the entry up once, not once per field
+                    loc = loc_data.get(call_id)
+                    if loc is None:
+                        loc = loc_data[call_id] = {"added": 0, "deleted": 0}
+                    loc["added"] = datapoint_int(dp)
+                    loc["language"] = resolve(attrs, "language") or "unknown"
+                    loc["filepath"] = resolve(attrs, "file.path") or "unknown"
+                    loc["model"] = resolve(attrs, "model") or "unknown"
+                    loc["user"] = resolve(attrs, "user") or "unknown"
+                    loc["version"] = resolve(attrs, "version") or "1.0.0"
+                    loc["session_id"] = resolve(attrs, "session.id") or "unknown"
+                    loc["time"] = cached_nano_to_iso(dp.get("timeUnixNano", "0"))
+
+        # Collect LOC deleted data
+        elif metric_name == METRIC_LOC_DELETED:
+            for dp in data_points:
+                # Only call.id is read here, so a plain scan beats building a map
+                call_id = get_attribute_value(dp.get("attributes", []), "call.id")
+                if call_id:
+                    loc = loc_data.get(call_id)
+                    if loc is None:
+                        loc = loc_data[call_id] = {"added": 0, "deleted": 0}
+                    loc["deleted"] = datapoint_int(dp)
 
-    resource_metrics = metrics_data.get("resourceMetrics", [])
-
-    for resource_metric in resource_metrics:
-        scope_metrics = resource_metric.get("scopeMetrics", [])
-
-        for scope_metric in scope_metrics:
-            metrics = scope_metric.get("metrics", [])
-
-            for metric in metrics:
-                metric_name = metric.get("name", "")
-
-                # Collect LOC added data
-                if metric_name == "opencode.tool.loc.added":
-                    sum_data = metric.get("sum", {})
-                    data_points = sum_data.get("dataPoints", [])
-
-                    for dp in data_points:
-                        attrs = dp.get("attributes", [])
-                        call_id = get_attribute_value(attrs, "call.id")
-                        if call_id:
-                            if call_id not in loc_data:
-                                loc_data[call_id] = {"added": 0, "deleted": 0}
-                            loc_data[call_id]["added"] = int(dp.get("asDouble", 0) or dp.get("asInt", 0))
-                            loc_data[call_id]["language"] = get_attribute_value(attrs, "language") or "unknown"
-                            loc_data[call_id]["filepath"] = get_attribute_value(attrs, "file.path") or "unknown"
-                            loc_data[call_id]["model"] = get_attribute_value(attrs, "model") or "unknown"
-                            loc_data[call_id]["user"] = get_attribute_value(attrs, "user") or "unknown"
-                            loc_data[call_id]["version"] = get_attribute_value(attrs, "version") or "1.0.0"
-                            loc_data[call_id]["session_id"] = get_attribute_value(attrs, "session.id") or "unknown"
-                            loc_data[call_id]["time"] = nano_to_iso(dp.get("timeUnixNano", "0"))
-
-                # Collect LOC deleted data
-                elif metric_name == "opencode.tool.loc.deleted":
-                    sum_data = metric.get("sum", {})
-                    data_points = sum_data.get("dataPoints", [])
-
-                    for dp in data_points:
-                        attrs = dp.get("attributes", [])
-                        call_id = get_attribute_value(attrs, "call.id")
-                        if call_id:
-                            if call_id not in loc_data:
-                                loc_data[call_id] = {"added": 0, "deleted": 0}
-                            loc_data[call_id]["deleted"] = int(dp.get("asDouble", 0) or dp.get("asInt", 0))
+        else:
+            permission_points.append(data_points)
 
     # Second pass: process permission requests and create final records
-    for resource_metric in resource_metrics:
-        scope_metrics = resource_metric.get("scopeMetrics", [])
-
-        for scope_metric in scope_metrics:
-            metrics = scope_metric.get("metrics", [])
-
-            for metric in metrics:
-                metric_name = metric.get("name", "")
-
-                if metric_name == "opencode.permission.requests":
-                    sum_data = metric.get("sum", {})
-                    data_points = sum_data.get("dataPoints", [])
-
-                    for dp in data_points:
-                        attrs = dp.get("attributes", [])
-                        call_id = get_attribute_value(attrs, "call.id")
-                        reply = get_attribute_value(attrs, "permission.reply")
-                        auto_approve = get_attribute_value(attrs, "auto_approve_edit")
-
-                        # Determine accept status
-                        # reply_type values: "once", "always", "auto", "reject"
-                        is_accepted = reply in ["once", "always", "auto", "accept", "auto_accept"]
-
-                        # Get LOC data for this call
-                        loc = loc_data.get(call_id, {})
-                        ai_loc = loc.get("added", 0) if is_accepted else 0
-
-                        # Get enrichment from traces lookup
-                        trace_info = traces_lookup.get(call_id, {}) if call_id else {}
-
-                        # Get enrichment from prompt lookup (has model/language from prompt records)
-                        prompt_info = prompt_lookup.get(call_id, {}) if call_id else {}
-
-                        # Determine filepath with fallback chain
-                        filepath = get_attribute_value(attrs, "file.path") or loc.get("filepath", "unknown")
-
-                        # Determine language with fallback chain:
-                        # 1. Direct from metrics attributes (if not "unknown")
-                        # 2. From LOC data (if not "unknown")
-                        # 3. From prompt lookup by call_id
-                        # 4. Infer from filepath extension
-                        language = get_attribute_value(attrs, "language")
-                        if not language or language == "unknown":
-                            language = loc.get("language")
-                        if not language or language == "unknown":
-                            language = prompt_info.get("language")
-                        if not language or language == "unknown":
-                            language = infer_language_from_filepath(filepath)
-                        if not language:
-                            language = "unknown"
-
-                        # Determine model with fallback chain:
-                        # 1. Direct from metrics attributes (if not "unknown")
-                        # 2. From LOC data (if not "unknown")
-                        # 3. From prompt lookup by call_id
-                        # 4. From traces lookup (legacy)
-                        model = get_attribute_value(attrs, "model")
-                        if not model or model == "unknown":
-                            model = loc.get("model")
-                        if not model or model == "unknown":
-                            model = prompt_info.get("model")
-                        if not model or model == "unknown":
-                            model = trace_info.get("model")
-                        if not model:
-                            model = "unknown"
-
-                        # Build final record matching analyze_metrics.py schema
-                        record = {
-                            "accept": is_accepted,
-                            "ai_loc": ai_loc,
-                            "ai_char": 0,
-                            "auto_approve_edit": auto_approve == True or str(auto_approve).lower() == "true",
-                            "completion_tokens": trace_info.get("output_tokens", 0),
-                            "effective": True,
-                            "filepath": filepath,
-                            "function_category": "opencode",
-                            "language": language,
-                            "model": model,
-                            "prompt_tokens": trace_info.get("input_tokens", 0),
-                            "sid": get_attribute_value(attrs, "session.id") or loc.get("session_id", "unknown"),
-                            "time": nano_to_iso(dp.get("timeUnixNano", "")),
-                            "user": get_attribute_value(attrs, "user") or loc.get("user", "unknown"),
-                            "user_char": 0,
-                            "user_loc": 0,
-                            "version": get_attribute_value(attrs, "version") or loc.get("version", "1.0.0"),
-                            "call_id": call_id,
-                            "reply_type": reply,
-                            "imported_at": datetime.now(timezone.utc).isoformat()
-                        }
-
-                        records.append(record)
+    for data_points in permission_points:
+        for dp in data_points:
+            attrs = attributes_by_key(dp.get("attributes", []))
+            call_id = resolve(attrs, "call.id")
+            reply = resolve(attrs, "permission.reply")
+            auto_approve = resolve(attrs, "auto_approve_edit")
+
+            # Determine accept status
+            # reply_type values: "once", "always", "auto", "reject"
+            # (an arrayValue reply would be an unhashable list)
+            is_accepted = isinstance(reply, str) and reply in ACCEPT_REPLIES
+
+            # Get LOC data for this call
+            loc = loc_data.get(call_id, EMPTY)
+            ai_loc = loc.get("added", 0) if is_accepted else 0
+
+            # Get enrichment from traces lookup
+            trace_info = traces_lookup.get(call_id, NO_TRACE_INFO) if call_id else NO_TRACE_INFO
+
+            # Get enrichment from prompt lookup (has model/language from prompt records)
+            prompt_info = prompt_lookup.get(call_id, EMPTY) if call_id else EMPTY
+
+            # Determine filepath with fallback chain
+            filepath = resolve(attrs, "file.path") or loc.get("filepath", "unknown")
+
+            # Determine language with fallback chain:
+            # 1. Direct from metrics attributes (if not "unknown")
+            # 2. From LOC data (if not "unknown")
+            # 3. From prompt lookup by call_id
+            # 4. Infer from filepath extension
+            language = resolve(attrs, "language")
+            if not language or language == "unknown":
+                language = loc.get("language")
+            if not language or language == "unknown":
+                language = prompt_info.get("language")
+            if not language or language == "unknown":
+                language = infer_language_from_filepath(filepath)
+            if not language:
+                language = "unknown"
+
+            # Determine model with fallback chain:
+            # 1. Direct from metrics attributes (if not "unknown")
+            # 2. From LOC data (if not "unknown")
+            # 3. From prompt lookup by call_id
+            # 4. From traces lookup (legacy)
+            model = resolve(attrs, "model")
+            if not model or model == "unknown":
+                model = loc.get("model")
+            if not model or model == "unknown":
+                model = prompt_info.get("model")
+            if not model or model == "unknown":
+                model = trace_info.model
+            if not model:
+                model = "unknown"
+
+            # Build final record matching analyze_metrics.py schema
+            record = {
+                "accept": is_accepted,
+                "ai_loc": ai_loc,
+                "ai_char": 0,
+                "auto_approve_edit": auto_approve == True or str(auto_approve).lower() == "true",
+                "completion_tokens": trace_info.output_tokens,
+                "effective": True,
+                "filepath": filepath,
+                "function_category": "opencode",
+                "language": language,
+                "model": model,
+                "prompt_tokens": trace_info.input_tokens,
+                "sid": resolve(attrs, "session.id") or loc.get("session_id", "unknown"),
+                "time": cached_nano_to_iso(dp.get("timeUnixNano", "")),
+                "user": resolve(attrs, "user") or loc.get("user", "unknown"),
+                "user_char": 0,
+                "user_loc": 0,
+                "version": resolve(attrs, "version") or loc.get("version", "1.0.0"),
+                "call_id": call_id,
+                "reply_type": reply,
+                "imported_at": imported_at
+            }
+
+            records.append(record)
 
     return records
 
 
+def extract_prompt_records_with(prompt_data_lookup: Dict[str, Dict], data: Dict,
+                                lookup: Optional[Dict]) -> List[Dict]:
+    """Record extractor for the traces file (bind prompt_data_lookup with partial)."""
+    return extract_prompt_records(data, prompt_data_lookup)
+
+
+def extract_enriched_metrics_with(prompt_lookup: Dict[str, Dict], data: Dict,
+                                  lookup: Optional[Dict]) -> List[Dict]:
+    """Record extractor for the metrics file (bind prompt_lookup with partial)."""
+    return extract_enriched_metrics(data, lookup or {}, prompt_lookup)
+
+
 # =============================================================================
 # Incremental File Processing
 # =============================================================================
 
+class ParsedLine(NamedTuple):
+    """One JSONL line, parsed into records ready to insert."""
+    start: int
+    end: int
+    records: List[Dict]
+    line_lookup: Optional[Dict]  # Traces lookup entries of the line, if any
+    invalid_json: Optional[str]  # Decode error message
+    error: Optional[str]  # Extraction error message
+
+
+def parse_lines(data, start: int, end: int, inode: int,
+                record_extractor: Callable[[Dict, Optional[Dict]], List[Dict]],
+                lookup: Optional[Dict]) -> Iterator[ParsedLine]:
+    """
+    Parse the lines beginning in data[start:end] (a mapped file) into
+    records with their unique _id set. No line reads past `end`.
+
+    This is lazy, so a caller that merges each line's line_lookup into
+    `lookup` before asking for the next line has it seen by later lines.
+    """
+    pos = start
+    while pos < end:
+        pos_before = pos
+        newline = data.find(b"\n", pos, end)
+        pos = end if newline == -1 else newline + 1
+        line_bytes = data[pos_before:pos]
+
+        if line_bytes.isspace():
+            yield ParsedLine(pos_before, pos, [], None, None, None)
+            continue
+
+        records = []
+        line_lookup = None
+        try:
+            # The decoder takes the raw bytes (and skips the newline), so
+            # the line is not decoded and stripped into a second copy
+            parsed = json_loads(line_bytes)
+
+            # Generate unique ID for this line
+            line_unique_id = generate_unique_id(inode, pos_before, line_bytes)
+
+            # Extract records
+            line_records = record_extractor(parsed, lookup)
+
+            for i, record in enumerate(line_records):
+                # Create unique ID for each record within the line
+                # (records carry no span_id, so it is the call_id or index)
+                record["_id"] = f"{line_unique_id}:{record.get('call_id') or f'r{i}'}"
+            records = line_records
+
+            # Lookup table entries if this is traces
+            if "resourceSpans" in parsed:
+                line_lookup = extract_traces_lookup(parsed)
+
+        except json.JSONDecodeError as e:
+            yield ParsedLine(pos_before, pos, [], None, str(e), None)
+            continue
+        except Exception as e:
+            yield ParsedLine(pos_before, pos, records, None, None, str(e))
+            continue
+
+        yield ParsedLine(pos_before, pos, records, line_lookup, None, None)
+
+
+def line_ranges(data, start: int, end: int, chunk: int) -> Iterator[Tuple[int, int]]:
+    """Split data[start:end] into (start, end) ranges of about `chunk` bytes on line boundaries."""
+    while start < end:
+        newline = data.find(b"\n", start + chunk - 1, end)
+        stop = end if newline == -1 else newline + 1
+        yield start, stop
+        start = stop
+
+
+# Set in each import worker by init_parse_worker
+_parse_worker_args: Tuple = ()
+
+
+def init_parse_worker(file_path: str, inode: int,
+                      record_extractor: Callable[[Dict, Optional[Dict]], List[Dict]],
+                      lookup: Optional[Dict]) -> None:
+    """Keep the per-file arguments in the worker, so tasks only carry a range."""
+    global _parse_worker_args
+    _parse_worker_args = (file_path, inode, record_extractor, lookup)
+
+
+def parse_file_range(start: int, end: int) -> List[ParsedLine]:
+    """Import worker task: parse the lines beginning in [start, end) of the file."""
+    file_path, inode, record_extractor, lookup = _parse_worker_args
+    with open(file_path, 'rb') as f, map_file(f) as mm:
+        return list(parse_lines(mm, start, end, inode, record_extractor, lookup))
+
+
+def parse_lines_parallel(data, file_path: str, start: int, end: int, inode: int,
+                         record_extractor: Callable[[Dict, Optional[Dict]], List[Dict]],
+                         lookup: Optional[Dict], jobs: int) -> Iterator[ParsedLine]:
+    """
+    parse_lines over a process pool: PARSE_CHUNK_BYTES ranges are parsed by
+    the workers and yielded back in file order, with at most two ranges per
+    worker in flight. Workers see `lookup` as it was at the start.
+    """
+    ranges = line_ranges(data, start, end, PARSE_CHUNK_BYTES)
+    # Flush first so forked workers don't inherit (and re-emit) buffered output
+    sys.stdout.flush()
+    with ProcessPoolExecutor(max_workers=jobs, initializer=init_parse_worker,
+                             initargs=(file_path, inode, record_extractor, lookup)) as executor:
+        pending = deque()
+        for range_start, range_end in ranges:
+            pending.append(executor.submit(parse_file_range, range_start, range_end))
+            if len(pending) >= 2 * jobs:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
 def process_file_incrementally(
     file_path: str,
     db,
@@ -818,7 +1393,8 @@ def process_file_incrementally(
     target_collection_name: str,
     record_extractor: Callable[[Dict, Optional[Dict]], List[Dict]],
     traces_lookup: Optional[Dict] = None,
-    dry_run: bool = False
+    dry_run: bool = False,
+    jobs: int = 1
 ) -> Tuple[int, int, int, Dict]:
     """
     Process JSONL file incrementally.
@@ -831,19 +1407,23 @@ def process_file_incrementally(
         record_extractor: Function to extract records from JSON data
         traces_lookup: Optional lookup table for enrichment
         dry_run: If True, parse but don't insert
+        jobs: Worker processes for parsing, used when there are at least
+            PARALLEL_MIN_BYTES of new data (record_extractor must pickle)
 
     Returns:
         Tuple of (new_records, duplicates_skipped, lines_processed, updated_lookup)
+        updated_lookup layers this file's entries over traces_lookup (a ChainMap)
     """
-    if not os.path.exists(file_path):
+    # Get file stats (one stat call also tells us whether it exists)
+    try:
+        stat = os.stat(file_path)
+    except FileNotFoundError:
         logger.warning(f"File not found: {file_path}")
         return 0, 0, 0, traces_lookup or {}
 
     # Load state
     state = load_state(db, state_collection_name)
 
-    # Get file stats
-    stat = os.stat(file_path)
     current_inode = stat.st_ino
     current_size = stat.st_size
     current_mtime = stat.st_mtime
@@ -884,106 +1464,147 @@ def process_file_incrementally(
     new_records = 0
     duplicates = 0
     lines_processed = 0
-    records_since_save = 0
     cumulative_records = state.get("records_inserted", 0)
 
     target_collection = db[target_collection_name]
-    updated_lookup = traces_lookup.copy() if traces_lookup else {}
+    # New entries go to a delta layer over the caller's lookup, which is
+    # read through rather than copied
+    updated_lookup = ChainMap({}, traces_lookup) if traces_lookup else {}
+    pending_inserts = []
+
+    # Batches are inserted (and checkpoints saved) in order by a writer
+    # thread, so the Mongo round trips overlap with parsing the next batch
+    write_queue = queue.Queue(maxsize=WRITE_QUEUE_BATCHES)
+    write_errors = []
+
+    def write_batches():
+        nonlocal new_records, duplicates
+        while True:
+            item = write_queue.get()
+            if item is None:
+                return
+            batch, checkpoint = item
+            if write_errors:
+                continue
+            try:
+                inserted = bulk_insert(target_collection, batch)
+                new_records += inserted
+                duplicates += len(batch) - inserted
+                if checkpoint:
+                    save_state(
+                        db, state_collection_name, file_path,
+                        records_inserted=cumulative_records + new_records,
+                        **checkpoint
+                    )
+                    logger.debug(f"  State checkpoint at line {checkpoint['line_number']}")
+            except Exception as e:
+                write_errors.append(e)
+
+    writer = threading.Thread(target=write_batches, daemon=True)
+    writer.start()
+
+    def flush_inserts(checkpoint: Optional[Dict] = None):
+        nonlocal pending_inserts
+        # A failed write stops the import here, like it did inline
+        if write_errors:
+            raise write_errors[0]
+        write_queue.put((pending_inserts, checkpoint))
+        pending_inserts = []
 
     # Track time range
     first_timestamp = None
     last_timestamp = None
 
-    with open(file_path, 'rb') as f:
-        f.seek(start_offset)
+    # The file is memory-mapped and split on newlines with mmap.find, so
+    # each line costs one slice instead of a buffered readline() + tell()
+    with open(file_path, 'rb') as f, map_file(f) as mm:
+        size = len(mm)
+        # Ask for a larger readahead window on the sequential scan
+        try:
+            mm.madvise(mmap.MADV_SEQUENTIAL)
+        except (AttributeError, OSError):
+            pass
+        pos = start_offset
 
         # Skip partial line if we rewound
-        if start_offset > 0:
-            partial = f.readline()
-            logger.debug(f"  Skipped partial line: {len(partial)} bytes")
+        if 0 < pos < size:
+            newline = mm.find(b"\n", pos)
+            skipped_to = size if newline == -1 else newline + 1
+            logger.debug(f"  Skipped partial line: {skipped_to - pos} bytes")
+            pos = skipped_to
 
         line_number = start_line
+        last_save = time.monotonic()
 
-        while True:
-            pos_before = f.tell()
-            line_bytes = f.readline()
+        # Lines are parsed by a process pool when there is a lot of new
+        # data; records and state are still handled here, in file order
+        if jobs > 1 and size - pos >= PARALLEL_MIN_BYTES:
+            lines = parse_lines_parallel(mm, file_path, pos, size, current_inode,
+                                         record_extractor, updated_lookup, jobs)
+        else:
+            lines = parse_lines(mm, pos, size, current_inode, record_extractor, updated_lookup)
 
-            if not line_bytes:
-                break  # EOF
+        # Per-record debug messages are only built in verbose runs
+        debug = logger.isEnabledFor(logging.DEBUG)
+        record_action = "Would insert (dry run)" if dry_run else "Queued insert"
+
+        for line in lines:
+            pos = line.end
 
             lines_processed += 1
             line_number += 1
 
-            try:
-                line_str = line_bytes.decode('utf-8').strip()
-                if not line_str:
-                    continue
-
-                data = json.loads(line_str)
-
-                # Generate unique ID for this line
-                line_unique_id = generate_unique_id(current_inode, pos_before, line_bytes)
-
-                # Extract records
-                records = record_extractor(data, updated_lookup)
-
-                for i, record in enumerate(records):
-                    # Create unique ID for each record within the line
-                    record_id = record.get("call_id") or record.get("span_id") or f"r{i}"
-                    record["_id"] = f"{line_unique_id}:{record_id}"
-
-                    # Track timestamps for summary
-                    ts = record.get("timestamp") or record.get("start_time")
-                    if ts:
-                        if first_timestamp is None:
-                            first_timestamp = ts
-                        last_timestamp = ts
-
-                    if not dry_run:
-                        # Upsert with $setOnInsert to prevent duplicates
-                        result = target_collection.update_one(
-                            {"_id": record["_id"]},
-                            {"$setOnInsert": record},
-                            upsert=True
-                        )
-
-                        if result.upserted_id:
-                            new_records += 1
-                            logger.debug(f"  Line {line_number}: Inserted (new)")
-                        else:
-                            duplicates += 1
-                            logger.debug(f"  Line {line_number}: Skipped (duplicate)")
-                    else:
-                        new_records += 1
-                        logger.debug(f"  Line {line_number}: Would insert (dry run)")
-
-                records_since_save += len(records)
-
-                # Update lookup table if this is traces
-                if "resourceSpans" in data:
-                    line_lookup = extract_traces_lookup(data)
-                    updated_lookup.update(line_lookup)
-
-            except json.JSONDecodeError as e:
-                logger.warning(f"  Invalid JSON at line {line_number}: {e}")
-            except Exception as e:
-                logger.error(f"  Error at line {line_number}: {e}")
-
-            # Periodic state save
-            if not dry_run and records_since_save >= STATE_SAVE_INTERVAL:
-                save_state(
-                    db, state_collection_name, file_path,
-                    offset=f.tell(),
-                    line_number=line_number,
-                    inode=current_inode,
-                    mtime=current_mtime,
-                    records_inserted=cumulative_records + new_records
-                )
-                records_since_save = 0
-                logger.debug(f"  State checkpoint at line {line_number}")
+            if line.invalid_json is not None:
+                logger.warning(f"  Invalid JSON at line {line_number}: {line.invalid_json}")
+
+            if line.records:
+                # Track timestamps for summary: records come in file order,
+                # so only a line's first and last record can move the range
+                if first_timestamp is None:
+                    first_timestamp = line.records[0].get("time")
+                last_timestamp = line.records[-1].get("time") or last_timestamp
+
+            if not dry_run:
+                # Queued and sent in bulk (see flush_inserts); records
+                # already in the collection are rejected by their _id
+                pending_inserts.extend(line.records)
+            else:
+                new_records += len(line.records)
+            if debug:
+                for _ in line.records:
+                    logger.debug("  Line %d: %s", line_number, record_action)
+
+            # Update lookup table if this is traces
+            if line.line_lookup:
+                updated_lookup.update(line.line_lookup)
+
+            if line.error is not None:
+                logger.error(f"  Error at line {line_number}: {line.error}")
+
+            if len(pending_inserts) >= BULK_WRITE_SIZE:
+                # Periodic state save, only right after a full batch is
+                # written (so the saved offset never runs ahead of what is in
+                # the collection, and checkpoints never cut batches short)
+                checkpoint = None
+                now = time.monotonic()
+                if now - last_save >= STATE_SAVE_SECONDS:
+                    checkpoint = {
+                        "offset": pos,
+                        "line_number": line_number,
+                        "inode": current_inode,
+                        "mtime": current_mtime,
+                    }
+                    last_save = now
+                flush_inserts(checkpoint)
 
         # Final offset
-        final_offset = f.tell()
+        flush_inserts()
+        final_offset = pos
+
+    write_queue.put(None)
+    writer.join()
+    if write_errors:
+        raise write_errors[0]
 
     # Final state save
     if not dry_run:
@@ -1014,7 +1635,9 @@ def process_file_incrementally(
     return new_records, duplicates, lines_processed, updated_lookup
 
 
-def process_traces_phase(db, traces_file: str, dry_run: bool = False) -> Tuple[Dict, Dict]:
+def process_traces_phase(db, traces_file: str, dry_run: bool = False,
+                         jobs: int = 1, use_cache: bool = True,
+                         rescan: bool = False) -> Tuple[Dict, Dict]:
     """
     Phase 1: Process traces file and build lookup tables.
 
@@ -1028,35 +1651,20 @@ def process_traces_phase(db, traces_file: str, dry_run: bool = False) -> Tuple[D
     logger.info("Phase 1: Processing Traces")
     logger.info("=" * 60)
 
-    # First, build lookup from ALL existing traces in the file
-    # This ensures we can enrich metrics even with older traces
-    logger.info("Building traces lookup table...")
-    full_lookup = {}
-
-    if os.path.exists(traces_file):
-        with open(traces_file, 'r') as f:
-            for line in f:
-                try:
-                    data = json.loads(line.strip())
-                    if "resourceSpans" in data:
-                        line_lookup = extract_traces_lookup(data)
-                        full_lookup.update(line_lookup)
-                except (json.JSONDecodeError, Exception):
-                    continue
-
+    # Build every lookup from ALL existing traces in the file, decoding each
+    # line once. The full traces lookup lets us enrich metrics even with
+    # older traces; the prompt data lookup is critical for proper
+    # model/token extraction when OTEL batches prompt spans and tool call
+    # spans in different JSONL lines
+    logger.info("Scanning traces file for lookup tables...")
+    full_lookup, prompt_data_lookup, tool_calls = scan_traces_cached(traces_file, jobs, use_cache, rescan)
     logger.info(f"  Loaded {len(full_lookup)} trace entries into lookup table")
-
-    # Build prompt data lookup from ALL traces for cross-line correlation
-    # This is critical for proper model/token extraction when OTEL batches
-    # prompt spans and tool call spans in different JSONL lines
-    logger.info("Building prompt data lookup table (for cross-line correlation)...")
-    prompt_data_lookup = build_prompt_data_lookup(traces_file)
     logger.info(f"  Loaded {len(prompt_data_lookup)} prompt data entries into lookup table")
 
     # Now process incrementally for new prompt records
     # Pass the prompt_data_lookup for cross-line correlation
-    def prompt_extractor(data: Dict, lookup: Optional[Dict]) -> List[Dict]:
-        return extract_prompt_records(data, prompt_data_lookup)
+    # (a partial rather than a closure, so import workers can unpickle it)
+    prompt_extractor = partial(extract_prompt_records_with, prompt_data_lookup)
 
     new_records, duplicates, lines, _ = process_file_incrementally(
         traces_file, db,
@@ -1064,39 +1672,21 @@ def process_traces_phase(db, traces_file: str, dry_run: bool = False) -> Tuple[D
         PROMPT_COLLECTION,
         prompt_extractor,
         full_lookup,
-        dry_run
+        dry_run,
+        jobs
     )
 
-    # Build prompt lookup from extracted prompt records for metrics enrichment
+    # Build prompt lookup for metrics enrichment from the scanned tool calls
     # This lookup maps call_id -> {model, language, ...} from prompt data
     logger.info("Building prompt lookup for metrics enrichment...")
-    prompt_lookup = {}
-
-    if os.path.exists(traces_file):
-        with open(traces_file, 'r') as f:
-            for line in f:
-                try:
-                    data = json.loads(line.strip())
-                    records = extract_prompt_records(data, prompt_data_lookup)
-                    for record in records:
-                        call_id = record.get("call_id")
-                        if call_id:
-                            prompt_lookup[call_id] = {
-                                "model": record.get("model", "unknown"),
-                                "language": record.get("language"),
-                                "file_path": record.get("file_path"),
-                                "prompt_tokens": record.get("prompt_tokens", 0),
-                                "completion_tokens": record.get("completion_tokens", 0),
-                            }
-                except (json.JSONDecodeError, Exception):
-                    continue
-
+    prompt_lookup = build_prompt_lookup(tool_calls, prompt_data_lookup)
     logger.info(f"  Loaded {len(prompt_lookup)} prompt entries for metrics enrichment")
 
     return full_lookup, prompt_lookup
 
 
-def process_metrics_phase(db, metrics_file: str, traces_lookup: Dict, prompt_lookup: Dict, dry_run: bool = False) -> None:
+def process_metrics_phase(db, metrics_file: str, traces_lookup: Dict, prompt_lookup: Dict, dry_run: bool = False,
+                          jobs: int = 1) -> None:
     """
     Phase 2: Process metrics file using prompt lookup for enrichment.
 
@@ -1106,14 +1696,14 @@ def process_metrics_phase(db, metrics_file: str, traces_lookup: Dict, prompt_loo
         traces_lookup: Legacy traces lookup (for tokens)
         prompt_lookup: {call_id: {model, language, ...}} from prompt records
         dry_run: If True, parse but don't insert
+        jobs: Worker processes for parsing a large amount of new data
     """
     logger.info("")
     logger.info("=" * 60)
     logger.info("Phase 2: Processing Metrics")
     logger.info("=" * 60)
 
-    def metrics_extractor(data: Dict, lookup: Optional[Dict]) -> List[Dict]:
-        return extract_enriched_metrics(data, lookup or {}, prompt_lookup)
+    metrics_extractor = partial(extract_enriched_metrics_with, prompt_lookup)
 
     process_file_incrementally(
         metrics_file, db,
@@ -1121,7 +1711,8 @@ def process_metrics_phase(db, metrics_file: str, traces_lookup: Dict, prompt_loo
         METRICS_COLLECTION,
         metrics_extractor,
         traces_lookup,
-        dry_run
+        dry_run,
+        jobs
     )
 
 
@@ -1202,6 +1793,17 @@ Examples:
         action="store_true",
         help="Enable verbose logging"
     )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=max(1, (os.cpu_count() or 2) // 2),
+        help="Worker processes for parsing large traces/metrics files (default: half the CPUs)"
+    )
+    parser.add_argument(
+        "--no-lookup-cache",
+        action="store_true",
+        help="Rescan the whole traces file instead of using (and updating) the lookup cache"
+    )
 
     args = parser.parse_args()
 
@@ -1237,14 +1839,15 @@ Examples:
         logger.info("Mode: DRY RUN (no data will be written)")
     logger.info("=" * 80)
 
-    import time
     start_time = time.time()
 
     # Phase 1: Process traces (and build lookups)
-    traces_lookup, prompt_lookup = process_traces_phase(db, args.traces_file, args.dry_run)
+    traces_lookup, prompt_lookup = process_traces_phase(
+        db, args.traces_file, args.dry_run, args.jobs,
+        use_cache=not args.no_lookup_cache, rescan=args.reset_state)
 
     # Phase 2: Process metrics (using both lookups for enrichment)
-    process_metrics_phase(db, args.metrics_file, traces_lookup, prompt_lookup, args.dry_run)
+    process_metrics_phase(db, args.metrics_file, traces_lookup, prompt_lookup, args.dry_run, args.jobs)
 
     # Final summary
     elapsed = time.time() - start_time
@@ -1253,9 +1856,9 @@ Examples:
     logger.info("Import Complete")
     logger.info("=" * 80)
 
-    # Get final counts
-    prompt_count = db[PROMPT_COLLECTION].count_documents({})
-    metrics_count = db[METRICS_COLLECTION].count_documents({})
+    # Get final counts (from collection metadata, without a collection scan)
+    prompt_count = db[PROMPT_COLLECTION].estimated_document_count()
+    metrics_count = db[METRICS_COLLECTION].estimated_document_count()
 
     logger.info(f"  Total documents in MongoDB:")
     logger.info(f"    {PROMPT_COLLECTION}: {prompt_count:,}")